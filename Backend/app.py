@@ -2,59 +2,1583 @@ from flask import Flask, jsonify, request, abort
 from flask_cors import CORS
 from werkzeug.security import generate_password_hash, check_password_hash
 import pandas as pd
+import numpy as np
 
-from pymongo import MongoClient
-from flask_bcrypt import Bcrypt
+from pymongo import ASCENDING, MongoClient, monitoring
+from pymongo.errors import DuplicateKeyError
+from bson import ObjectId
+from bson.errors import InvalidId
 import os
+import sys
+from collections import namedtuple
+
+if __name__ == '__main__':
+    # The bcrypt pool's workers re-import the main script, which must not be
+    # this module: hand over to the thin launcher before loading anything
+    # (see run.py).
+    launcher = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'run.py')
+    os.execv(sys.executable, [sys.executable, launcher] + sys.argv[1:])
 
 
 app = Flask(__name__)
 CORS(app,resources={r"/*": {"origins": "*"}})
-bcrypt = Bcrypt(app)
 # Allow routes to be reached with or without a trailing slash to avoid
 # automatic redirects that can turn POSTs into GETs and produce 405 errors
 # (keeps behavior consistent without adding endpoints)
 app.url_map.strict_slashes = False
 
+
+# ---------------------------------------------
+# 📈 OBSERVABILITY (leveled logging + Prometheus metrics)
+# ---------------------------------------------
+import bisect
+import hmac
+import importlib
+import logging
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from flask import Response, g
+
+# Per-request chatter is logged at DEBUG/INFO; LOG_SAMPLE_RATE keeps only a
+# fraction of those records under load. WARNING and above are always kept.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", 1.0))
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", 1.0))
+
+
+class SamplingFilter(logging.Filter):
+    """Keep every WARNING+ record and a random ``rate`` fraction of the rest."""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or self.rate >= 1 or random.random() < self.rate
+
+
+app.logger.setLevel(LOG_LEVEL)
+app.logger.addFilter(SamplingFilter(LOG_SAMPLE_RATE))
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labelnames, labels, extra=None):
+    pairs = list(zip(labelnames, labels))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        '{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for k, v in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+class Counter:
+    """Monotonic counter with optional labels (Prometheus ``counter``)."""
+
+    type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in values.items():
+            yield self.name, _format_labels(self.labelnames, labels), value
+
+
+class Histogram:
+    """Latency histogram with optional labels (Prometheus ``histogram``)."""
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def samples(self):
+        with self._lock:
+            series = {labels: (list(counts), total, n) for labels, (counts, total, n) in self._series.items()}
+        for labels, (counts, total, n) in series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                yield self.name + '_bucket', _format_labels(self.labelnames, labels, ('le', le)), cumulative
+            yield self.name + '_sum', _format_labels(self.labelnames, labels), total
+            yield self.name + '_count', _format_labels(self.labelnames, labels), n
+
+
+class MetricsRegistry:
+    """Holds metrics and renders them in the Prometheus text format.
+
+    ``collector`` functions are called at scrape time and return
+    (name, type, help, [(labels_dict, value), ...]) tuples, which is how
+    cache counters kept elsewhere are exported.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, fn):
+        self._collectors.append(fn)
+        return fn
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {value}")
+        for fn in self._collectors:
+            for name, metric_type, documentation, samples in fn():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    label_str = _format_labels(tuple(labels), tuple(labels.values()))
+                    lines.append(f"{name}{label_str} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+REQUEST_LATENCY = metrics.histogram(
+    'http_request_duration_seconds', 'Request latency by route.', ['endpoint', 'method', 'status'])
+WEATHER_LATENCY = metrics.histogram(
+    'weather_provider_request_duration_seconds', 'OpenWeatherMap call latency per attempt.', ['outcome'])
+WEATHER_RETRIES = metrics.counter(
+    'weather_provider_retries_total', 'OpenWeatherMap attempts that failed and were retried.')
+MONGO_LATENCY = metrics.histogram(
+    'mongodb_command_duration_seconds', 'MongoDB command latency.', ['command', 'outcome'])
+FILTER_LATENCY = metrics.histogram(
+    'dataframe_filter_duration_seconds', 'Time spent selecting rows from the datasets.', ['operation'])
+
+
+_monitored_caches = {}
+
+
+def register_cache_metrics(name, cache):
+    """Export a TTLCache's counters under ``cache_*{cache="<name>"}``."""
+    _monitored_caches[name] = cache
+
+
+@metrics.collector
+def _collect_cache_metrics():
+    stats = {name: cache.stats() for name, cache in _monitored_caches.items()}
+    yield 'cache_size', 'gauge', 'Entries currently cached.', [
+        ({'cache': name}, s['size']) for name, s in stats.items()
+    ]
+    for key in ('hits', 'stale_hits', 'misses', 'coalesced', 'evictions', 'refresh_errors'):
+        yield f'cache_{key}_total', 'counter', f'Cache {key.replace("_", " ")}.', [
+            ({'cache': name}, s[key]) for name, s in stats.items()
+        ]
+
+
+class MongoCommandTimer(monitoring.CommandListener):
+    """Record every MongoDB command's duration in MONGO_LATENCY."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_LATENCY.observe(event.duration_micros / 1e6, event.command_name, 'success')
+
+    def failed(self, event):
+        MONGO_LATENCY.observe(event.duration_micros / 1e6, event.command_name, 'failure')
+
+
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def _record_request_latency(response):
+    started = g.pop('request_started', None)
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    # Label by route pattern (not raw path) to keep cardinality bounded
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    REQUEST_LATENCY.observe(elapsed, endpoint, request.method, response.status_code)
+    if elapsed >= SLOW_REQUEST_SECONDS:
+        app.logger.warning('Slow request %s %s took %.3fs (status %s)',
+                           request.method, request.full_path, elapsed, response.status_code)
+    return response
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
 # Connect to MongoDB Atlas with error handling and timeouts
 from dotenv import load_dotenv
 load_dotenv()
 mongo_uri = os.getenv("MONGO_URI")
 
-try:
-    # Set shorter timeouts and add retryWrites
-    client = MongoClient(
-        mongo_uri,
-        serverSelectionTimeoutMS=5000,  # 5 second timeout
-        connectTimeoutMS=5000,
-        socketTimeoutMS=5000,
-        retryWrites=True
-    )
-    # Test the connection
-    client.admin.command('ping')
-    print("Successfully connected to MongoDB.")
-    db = client["tourism_db"]
-    users_collection = db["users"]
-except Exception as e:
-    print(f"Warning: MongoDB connection failed: {str(e)}")
-    print("The application will continue with limited functionality (user features disabled).")
+MONGO_TIMEOUT_SECONDS = 5
+# Seconds between background pings once the first one has completed.
+MONGO_HEALTH_INTERVAL = float(os.getenv("MONGO_HEALTH_INTERVAL", 30))
+# Per-process connection pool. Keeping a few connections open avoids a
+# TLS handshake on the first login after an idle period; a request that
+# finds the pool exhausted fails after MONGO_TIMEOUT_SECONDS instead of
+# queueing indefinitely.
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 20))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 2))
+MONGO_MAX_IDLE_SECONDS = int(os.getenv("MONGO_MAX_IDLE_SECONDS", 300))
+
+# Unique indexes let /register detect duplicates with a single insert and
+# make every username lookup an index seek.
+USER_INDEXES = [
+    ("username", "username_unique"),
+    ("email", "email_unique"),
+]
+
+client = None
+db = None
+# Set only while MongoDB answers pings; routes check it via mongo_ready().
+users_collection = None
+# True once USER_INDEXES exist on users_collection.
+user_indexes_ready = False
+_mongo_checked = threading.Event()
+_mongo_stop = threading.Event()
+
+
+def connect_mongo():
+    """(Re)start the MongoDB connection in the background.
+
+    Never blocks: a health-check thread creates the client (which for
+    ``mongodb+srv://`` URIs already means a DNS lookup), pings it, and
+    publishes ``client`` / ``db`` / ``users_collection`` once the server
+    answers, clearing them again if pings start failing. Called at import
+    and again in each gunicorn worker after fork, since a MongoClient must
+    not be shared across a fork.
+    """
+    global _mongo_checked, _mongo_stop
+    close_mongo()
+    _mongo_checked = threading.Event()
+    _mongo_stop = threading.Event()
+    threading.Thread(target=_mongo_health_check, args=(_mongo_checked, _mongo_stop),
+                     name="mongo-health", daemon=True).start()
+
+
+def _mongo_health_check(checked, stop):
+    global client, db, users_collection
+    mongo_client = None
+    healthy = None
+    while True:
+        try:
+            if mongo_client is None:
+                # Set shorter timeouts and add retryWrites
+                mongo_client = MongoClient(
+                    mongo_uri,
+                    serverSelectionTimeoutMS=MONGO_TIMEOUT_SECONDS * 1000,
+                    connectTimeoutMS=MONGO_TIMEOUT_SECONDS * 1000,
+                    socketTimeoutMS=MONGO_TIMEOUT_SECONDS * 1000,
+                    retryWrites=True,
+                    maxPoolSize=MONGO_MAX_POOL_SIZE,
+                    minPoolSize=MONGO_MIN_POOL_SIZE,
+                    maxIdleTimeMS=MONGO_MAX_IDLE_SECONDS * 1000,
+                    waitQueueTimeoutMS=MONGO_TIMEOUT_SECONDS * 1000,
+                    event_listeners=[MongoCommandTimer()]
+                )
+            mongo_client.admin.command('ping')
+            ok = True
+        except Exception as e:
+            ok = False
+            error = e
+        if stop.is_set():
+            # close_mongo() ran while we were connecting or pinging.
+            if mongo_client is not None:
+                mongo_client.close()
+            return
+        if ok != healthy:
+            if ok:
+                app.logger.info("Successfully connected to MongoDB.")
+                client = mongo_client
+                db = mongo_client["tourism_db"]
+                users_collection = db["users"]
+                if not user_indexes_ready:
+                    ensure_user_indexes(users_collection)
+            else:
+                app.logger.warning("MongoDB connection failed: %s", error)
+                app.logger.warning("The application will continue with limited functionality (user features disabled).")
+                db = None
+                users_collection = None
+            healthy = ok
+        checked.set()
+        if stop.wait(MONGO_HEALTH_INTERVAL):
+            if mongo_client is not None:
+                mongo_client.close()
+            return
+
+
+def ensure_user_indexes(collection):
+    """Create USER_INDEXES (a no-op when they already exist).
+
+    Fails if the collection already holds duplicate usernames or emails;
+    /register then falls back to checking for duplicates before inserting.
+    """
+    global user_indexes_ready
+    try:
+        for field, name in USER_INDEXES:
+            collection.create_index([(field, ASCENDING)], name=name, unique=True)
+    except Exception as e:
+        app.logger.error("Could not create unique user indexes (duplicate users?): %s", e)
+        return False
+    user_indexes_ready = True
+    return True
+
+
+def close_mongo():
+    """Stop the health check and close the client (if any)."""
+    global client, db, users_collection, user_indexes_ready
+    _mongo_stop.set()
+    if client is not None:
+        client.close()
     client = None
     db = None
     users_collection = None
+    user_indexes_ready = False
+
+
+def mongo_ready(timeout=MONGO_TIMEOUT_SECONDS):
+    """Return True if MongoDB is reachable.
+
+    Right after startup this waits (up to ``timeout``) for the first
+    health check instead of reporting the database as down.
+    """
+    _mongo_checked.wait(timeout)
+    return users_collection is not None
+
+
+def use_users_collection(collection):
+    """Serve users from ``collection`` instead of MongoDB.
+
+    Stops the health check and closes the client. For benchmarks and local
+    tools that supply an in-memory stand-in with the methods used here.
+    """
+    global users_collection
+    close_mongo()
+    users_collection = collection
+    ensure_user_indexes(collection)
+    _mongo_checked.set()
+
+
+connect_mongo()
 
 
 # In-memory user store for demo authentication
 users = {}
 
-# Load data files
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Data files are loaded into a DataSnapshot (see below) by dataset_manager:
+# memory-mapped from data/compiled/ when it is up to date, otherwise parsed
+# from the CSVs, and reloaded without a restart when they change.
+from datasets import MONTHS, DatasetManager
+
+DATA_RELOAD_INTERVAL = float(os.getenv("DATA_RELOAD_INTERVAL", 5))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+
+# ---------------------------------------------
+# 🔎 NAME LOOKUP INDEXES (built once at load time)
+# ---------------------------------------------
+def normalize_name(name):
+    """Lower-case a state/city name and collapse surrounding/inner whitespace."""
+    return ' '.join(str(name).strip().lower().split())
+
+
+class NameIndex:
+    """Map normalized names in a DataFrame column to their row positions.
+
+    Lookups try, in order: the exact normalized name, the name with all
+    spaces removed ("tamilnadu" -> "tamil nadu"), and finally a substring
+    match over the distinct keys. The fallback only scans the distinct
+    names (36 states), never the rows, and its results are memoized.
+    """
+
+    _FALLBACK_CACHE_SIZE = 1024
+
+    def __init__(self, values):
+        self._rows = {}
+        self._compact = {}
+        for pos, value in enumerate(values):
+            if pd.isna(value):
+                continue
+            key = normalize_name(value)
+            self._rows.setdefault(key, []).append(pos)
+            self._compact.setdefault(key.replace(' ', ''), key)
+        self._fallback = {}
+
+    def keys(self):
+        return list(self._rows)
+
+    def resolve(self, name, partial=True):
+        """Return the list of matching keys (in file order) for ``name``."""
+        key = normalize_name(name)
+        if key in self._rows:
+            return [key]
+        compact = key.replace(' ', '')
+        if compact in self._compact:
+            return [self._compact[compact]]
+        if not partial:
+            return []
+
+        matches = self._fallback.get(key)
+        if matches is None:
+            matches = [k for k in self._rows if key in k]
+            if len(self._fallback) >= self._FALLBACK_CACHE_SIZE:
+                self._fallback.clear()
+            self._fallback[key] = matches
+        return matches
+
+    def positions(self, name, partial=True):
+        """Return row positions (sorted, file order) matching ``name``."""
+        keys = self.resolve(name, partial)
+        if len(keys) == 1:
+            return self._rows[keys[0]]
+        return sorted(pos for k in keys for pos in self._rows[k])
+
+    def first(self, name, partial=True):
+        """Return the first matching row position or None."""
+        positions = self.positions(name, partial)
+        return positions[0] if positions else None
+
+
+def build_city_index(df):
+    """Map (normalized state, normalized city) pairs to row positions."""
+    index = {}
+    for pos, (state, city) in enumerate(zip(df['state_name'], df['city_name'])):
+        if pd.isna(state) or pd.isna(city):
+            continue
+        index.setdefault((normalize_name(state), normalize_name(city)), []).append(pos)
+    return index
+
+
+# ---------------------------------------------
+# 📦 JSON SERIALIZATION
+# ---------------------------------------------
+def dataframe_to_records(df, columns=None, float_columns=(), fill=None):
+    """Convert DataFrame rows to JSON-ready dicts one column at a time.
+
+    Each column is cast and NaN-filled once (``float_columns`` become floats
+    with NaN -> 0.0, everything else NaN -> ``fill``) and converted to
+    native Python values with ``tolist()``; the records are then zipped
+    together. This avoids per-row ``iterrows``/``pd.notna`` work and never
+    emits NaN, which is not valid JSON.
+    """
+    columns = list(df.columns if columns is None else columns)
+    if df.empty:
+        return []
+
+    values = []
+    for col in columns:
+        series = df[col]
+        if col in float_columns:
+            values.append(series.astype(float).fillna(0.0).tolist())
+        elif series.hasnans:
+            values.append(series.astype(object).where(series.notna(), fill).tolist())
+        else:
+            values.append(series.tolist())
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+
+# ---------------------------------------------
+# 📄 PAGINATION, FIELD PROJECTION AND TOP-K
+# ---------------------------------------------
+import base64
+
+MAX_PAGE_SIZE = 500
+
+
+def _encode_token(kind, value):
+    return base64.urlsafe_b64encode(f"{kind}:{value}".encode()).decode().rstrip('=')
+
+
+def _decode_token(cursor, kind):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        prefix, value = base64.urlsafe_b64decode(padded.encode()).decode().split(':', 1)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid 'cursor'")
+    if prefix != kind:
+        raise ValueError("Invalid 'cursor'")
+    return value
+
+
+def encode_cursor(offset):
+    return _encode_token('o', offset)
+
+
+def decode_cursor(cursor):
+    try:
+        offset = int(_decode_token(cursor, 'o'))
+    except ValueError:
+        raise ValueError("Invalid 'cursor'")
+    if offset < 0:
+        raise ValueError("Invalid 'cursor'")
+    return offset
+
+
+def parse_page_params(params, allowed_fields, decode=decode_cursor, start=0):
+    """Read ``limit``, ``cursor`` and ``fields`` from query args or a JSON body.
+
+    Returns (limit, offset, fields); ``limit`` and ``fields`` are None when
+    not requested. ``fields`` may be a list or a comma-separated string.
+    ``decode`` turns the cursor into a position (a row offset by default;
+    ``start`` when there is no cursor). Raises ValueError with a
+    client-facing message on bad input.
+    """
+    limit = params.get('limit')
+    if limit is not None and limit != '':
+        try:
+            limit = int(limit)
+        except (TypeError, ValueError):
+            raise ValueError("'limit' must be an integer")
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"'limit' must be between 1 and {MAX_PAGE_SIZE}")
+    else:
+        limit = None
+
+    cursor = params.get('cursor')
+    offset = decode(str(cursor)) if cursor else start
+
+    fields = params.get('fields')
+    if fields:
+        if isinstance(fields, str):
+            fields = fields.split(',')
+        fields = list(dict.fromkeys(str(f).strip() for f in fields if str(f).strip()))
+        unknown = [f for f in fields if f not in allowed_fields]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    else:
+        fields = None
+
+    return limit, offset, fields
+
+
+def select_top(df, column, k=None, ascending=False):
+    """Return rows ordered by ``column``; only the first ``k`` when given.
+
+    With ``k`` this is a partial selection (``nlargest``/``nsmallest``)
+    rather than a full sort. Ties keep their table order either way, so
+    consecutive pages are consistent.
+    """
+    if k is None or k >= len(df):
+        return df.sort_values(column, ascending=ascending, kind='stable', na_position='last')
+    if ascending:
+        return df.nsmallest(k, column, keep='first')
+    return df.nlargest(k, column, keep='first')
+
+
+def page_positions(positions, offset, limit):
+    """``paginate`` for an array of row positions: (page, next_cursor)."""
+    end = len(positions) if limit is None else offset + limit
+    next_cursor = encode_cursor(end) if end < len(positions) else None
+    return positions[offset:end], next_cursor
+
+
+def paginate(df, offset, limit, total=None):
+    """Slice an already ordered frame; returns (page, next_cursor or None).
+
+    ``total`` is the size of the full result when ``df`` was already cut
+    down to the top ``offset + limit`` rows by ``select_top``.
+    """
+    if limit is None:
+        return df.iloc[offset:], None
+    end = offset + limit
+    total = len(df) if total is None else total
+    next_cursor = encode_cursor(end) if end < total else None
+    return df.iloc[offset:end], next_cursor
+
+
+# ---------------------------------------------
+# 🗓️ PLACE SEARCH INDEX (month bitmasks, category codes)
+# ---------------------------------------------
+def month_query_bits(month):
+    """Mask of months whose name contains the query ("jan", "January", "ju")."""
+    query = str(month).strip().lower()
+    mask = 0
+    for i, name in enumerate(MONTHS):
+        if query and query in name:
+            mask |= 1 << i
+    return mask
+
+
+class PlaceSearchIndex:
+    """Filter arrays for place search, parsed once from ``cities_df``.
+
+    Month columns become 12-bit masks, categories become integer codes and
+    rating/risk become float arrays, so a multi-criteria search is a few
+    vectorized comparisons with no per-request string scans.
+    """
+
+    def __init__(self, df, month_masks):
+        # (popular_months, popular_months | best_time_to_visit ranges),
+        # built by datasets.city_month_masks or loaded precompiled
+        self.popular_months, self.any_months = month_masks
+
+        categories = df['category'].str.strip().str.lower()
+        codes, uniques = pd.factorize(categories)
+        self.category_codes = codes
+        self.category_lookup = {name: code for code, name in enumerate(uniques)}
+
+        self.rating = df['tourist_rating'].to_numpy(dtype=float)
+        self.risk = df['risk_index'].to_numpy(dtype=float)
+
+    def category_mask(self, categories, positions=None):
+        codes = [self.category_lookup.get(str(c).strip().lower(), -2) for c in categories]
+        category_codes = self.category_codes if positions is None else self.category_codes[positions]
+        return np.isin(category_codes, codes)
+
+    def match(self, positions=None, categories=None, month=None, popular_only=False,
+              min_rating=None, max_risk=None, risk_scale=1):
+        """Boolean mask over ``positions`` (all rows when None) for the criteria.
+
+        ``risk_scale`` compares ``risk * risk_scale <= max_risk`` (/recommend
+        takes max_risk on a 0-10 scale). NaN ratings/risks never match.
+        """
+        rows = slice(None) if positions is None else positions
+        mask = np.ones(len(self.rating) if positions is None else len(positions), dtype=bool)
+        if categories is not None:
+            mask &= self.category_mask(categories, positions)
+        if month:
+            months = self.popular_months if popular_only else self.any_months
+            mask &= (months[rows] & month_query_bits(month)) != 0
+        if min_rating is not None:
+            mask &= self.rating[rows] >= min_rating
+        if max_risk is not None:
+            mask &= (self.risk[rows] * risk_scale) <= max_risk
+        return mask
+
+    def filter(self, **criteria):
+        """Return sorted row positions matching every given criterion (see ``match``)."""
+        return np.flatnonzero(self.match(**criteria))
+
+
+# ---------------------------------------------
+# 📍 GEO INDEX (nearest places)
+# ---------------------------------------------
+EARTH_RADIUS_KM = 6371.0088
+# Grid cell size in degrees (~55 km north-south)
+GEO_CELL_DEG = 0.5
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; arguments in radians, arrays broadcast."""
+    a = (np.sin((lat2 - lat1) / 2) ** 2 +
+         np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GeoIndex:
+    """Latitude/longitude grid for radius and nearest-neighbour queries.
+
+    Points are bucketed into ``cell_deg`` cells and stored sorted by cell, so
+    the candidates for a circle are a few contiguous slices found with
+    ``searchsorted``; exact haversine distances are computed only for those.
+    A k-nearest query starts with a one-cell circle and widens it (up to
+    the requested radius) until it holds k matching points, which keeps the
+    answer exact. Rows without coordinates are left out.
+    """
+
+    def __init__(self, lat, lon, cell_deg=GEO_CELL_DEG):
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        valid = np.flatnonzero(np.isfinite(lat) & np.isfinite(lon) & (np.abs(lat) <= 90))
+        self.cell_deg = cell_deg
+        self.n_rows = int(np.ceil(180 / cell_deg))
+        self.n_cols = int(np.ceil(360 / cell_deg))
+
+        cells = self._cells(lat[valid], lon[valid])
+        order = np.argsort(cells, kind='stable')
+        self.positions = valid[order]
+        self.cells = cells[order]
+        self.lat = np.radians(lat[self.positions])
+        self.lon = np.radians(lon[self.positions])
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _cells(self, lat, lon):
+        rows = np.minimum((lat + 90) // self.cell_deg, self.n_rows - 1).astype(np.int64)
+        cols = (((lon + 180) % 360) // self.cell_deg).astype(np.int64) % self.n_cols
+        return rows * self.n_cols + cols
+
+    def _candidates(self, lat, lon, radius_km):
+        """Indices into the sorted arrays of points in cells the circle touches."""
+        d = radius_km / EARTH_RADIUS_KM
+        dlat = np.degrees(d)
+        lo, hi = lat - dlat, lat + dlat
+        if d >= np.pi / 2 or lo <= -90 or hi >= 90:
+            return np.arange(len(self.cells))
+        rows = np.arange(int((lo + 90) // self.cell_deg), int((hi + 90) // self.cell_deg) + 1)
+
+        # Widest longitude offset of a circle that does not contain a pole
+        ratio = np.sin(d) / np.cos(np.radians(lat))
+        dlon = 180.0 if ratio >= 1 else np.degrees(np.arcsin(ratio)) + 1e-9
+        first = int((lon - dlon + 180) // self.cell_deg)
+        last = int((lon + dlon + 180) // self.cell_deg)
+        if last - first + 1 >= self.n_cols:
+            cols = np.arange(self.n_cols)
+        else:
+            cols = np.arange(first, last + 1) % self.n_cols
+
+        keys = (rows[:, None] * self.n_cols + cols[None, :]).ravel()
+        if len(keys) >= len(self.cells):
+            return np.arange(len(self.cells))
+        starts = np.searchsorted(self.cells, keys, side='left')
+        ends = np.searchsorted(self.cells, keys, side='right')
+        hit = ends > starts
+        if not hit.any():
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([np.arange(s, e) for s, e in zip(starts[hit], ends[hit])])
+
+    def _within(self, lat, lon, radius_km, accept):
+        idx = self._candidates(lat, lon, radius_km)
+        dist = haversine_km(np.radians(lat), np.radians(lon), self.lat[idx], self.lon[idx])
+        keep = dist <= radius_km
+        positions, dist = self.positions[idx[keep]], dist[keep]
+        if accept is not None and len(positions):
+            ok = accept(positions)
+            positions, dist = positions[ok], dist[ok]
+        return positions, dist
+
+    def nearest(self, lat, lon, k=None, radius_km=None, accept=None):
+        """Return (row positions, distances in km) closest first.
+
+        At most ``k`` points, only those within ``radius_km`` when given, and
+        only rows for which the boolean mask ``accept(positions)`` is True.
+        Equal distances are ordered by row position.
+        """
+        limit = np.pi * EARTH_RADIUS_KM if radius_km is None else radius_km
+        radius = limit if k is None else min(np.radians(self.cell_deg) * EARTH_RADIUS_KM, limit)
+        while True:
+            positions, dist = self._within(lat, lon, radius, accept)
+            if k is None or len(positions) >= k or radius >= limit:
+                break
+            radius = min(radius * 4, limit)
+        if k is not None and len(positions) > k:
+            # Partial selection first; the tie-break below needs every point
+            # at the k-th distance
+            cutoff = np.partition(dist, k - 1)[k - 1]
+            near = dist <= cutoff
+            positions, dist = positions[near], dist[near]
+        order = np.lexsort((positions, dist))[:k]
+        return positions[order], dist[order]
+
+
+# ---------------------------------------------
+# ⚖️ COMPARISON TABLES (built once per snapshot)
+# ---------------------------------------------
+VISITOR_YEARS = [2020, 2021, 2022, 2023, 2024, 2025]
+CITY_COMPARE_FIELDS = ['tourist_rating', 'risk_index', 'category', 'best_time_to_visit']
+# Upper bound on entities per /compare request
+COMPARE_MAX_ITEMS = 50
+
+
+def split_list_field(value):
+    """Parse a "['Beaches', 'Heritage Sites']" style cell into a list of strings."""
+    if not isinstance(value, str) or not value:
+        return []
+    return [x.strip().strip("'\"") for x in value.strip("[] ").split(',') if x.strip()]
+
+
+class ComparisonTable:
+    """JSON-ready comparison values, one list per field indexed by row position.
+
+    Everything a compare response shows is parsed and converted once when
+    the snapshot is built, so comparing N rows is N lookups per field.
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    def compare(self, labels, positions):
+        """Return ``{field: {label: value}}`` for the rows at ``positions``."""
+        pairs = list(zip(labels, positions))
+        return {field: {label: values[pos] for label, pos in pairs}
+                for field, values in self.columns.items()}
+
+
+def _cell(row, name, cast, default):
+    """``cast(row[name])``, or ``default`` when the cell is missing or blank (NaN)."""
+    value = row.get(name)
+    if value is None or pd.isna(value):
+        return default
+    return cast(value)
+
+
+def build_state_comparison(states_df, cities_df, city_states_index):
+    rows = states_df.to_dict('records')
+    ratings = np.nan_to_num(cities_df['tourist_rating'].to_numpy(dtype=float))
+    city_names = cities_df['city_name'].tolist()
+
+    def top_city(state):
+        # Highest tourist_rating (NaN counts as 0); the first row wins ties
+        positions = city_states_index.positions(state, partial=False)
+        if not positions:
+            return ''
+        return city_names[positions[int(np.argmax(ratings[positions]))]]
+
+    columns = {f'visitors_{year}': [_cell(row, f'visitors_{year}', int, 0) for row in rows]
+               for year in VISITOR_YEARS}
+    famous_for = [split_list_field(row.get('famous_for')) for row in rows]
+    best_season = [split_list_field(row.get('best_season')) for row in rows]
+    columns.update({
+        'famous_for': famous_for,
+        'top_category': [items[0] if items else 'General' for items in famous_for],
+        'top_city': [top_city(row['state_name']) for row in rows],
+        'best_season': [items[0] if items else 'Year-round' for items in best_season],
+        'population': [_cell(row, 'population', int, 0) for row in rows],
+        'literacy_rate': [_cell(row, 'literacy_rate', float, 0.0) for row in rows],
+        'gdp_inr_crore': [_cell(row, 'gdp_inr_crore', float, 0.0) for row in rows],
+        'area_km2': [_cell(row, 'area_km2', float, 0.0) for row in rows],
+        'safety_index': [_cell(row, 'safety_index', float, 1.0) for row in rows],
+        'capital': [_cell(row, 'capital', str, '') for row in rows],
+        'region': [_cell(row, 'region', str, '') for row in rows],
+    })
+    return ComparisonTable(columns)
+
+
+def build_city_comparison(cities_df):
+    return ComparisonTable({field: cities_df[field].tolist() for field in CITY_COMPARE_FIELDS})
+
+
+def numbered_params(params, *names):
+    """Collect ``state1``/``city1``, ``state2``/``city2``, ... as tuples.
+
+    Stops at the first index where any of ``names`` is missing.
+    """
+    items = []
+    while True:
+        n = len(items) + 1
+        values = tuple(params.get(f'{name}{n}') for name in names)
+        if not all(values):
+            return items
+        items.append(values)
+
+
+# ---------------------------------------------
+# ⚠️ RISK PROFILES (state risk joined onto cities)
+# ---------------------------------------------
+RISK_FACTOR_COLUMNS = [
+    'flood_risk', 'landslide_risk', 'earthquake_zone',
+    'crime_rate', 'accident_rate', 'cyclone_risk',
+    'drought_risk', 'forest_fire_risk', 'sea_erosion_risk'
+]
+_SEISMIC_ZONE_RE = re.compile(r'^\s*(?:zone\s*)?([ivx]+|\d+)\s*$', re.IGNORECASE)
+_ROMAN = {'i': 1, 'ii': 2, 'iii': 3, 'iv': 4, 'v': 5}
+
+
+def seismic_zone_level(value):
+    """"Zone III" / "III" / "3" -> 3; None when unparseable."""
+    match = _SEISMIC_ZONE_RE.match(str(value))
+    if not match:
+        return None
+    token = match.group(1).lower()
+    return int(token) if token.isdigit() else _ROMAN.get(token)
+
+
+def risk_factor_score(column, value):
+    """Numeric 0-1 score for a risk column value, NaN when missing.
+
+    Seismic zones (I-V) map to (level - 1) / 4, so Zone V scores 1.0.
+    """
+    if column == 'earthquake_zone':
+        level = seismic_zone_level(value) if isinstance(value, str) else None
+        return np.nan if level is None else min(max((level - 1) / 4, 0.0), 1.0)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _present(value):
+    return not pd.isna(value) and str(value).strip().lower() not in ('', 'nan')
+
+
+class RiskProfiles:
+    """Risk data cleaned once per snapshot.
+
+    ``records[pos]`` is the /states/<name>/risk payload for ``risk_df`` row
+    ``pos`` (missing factors left out, as before). ``scores`` holds every
+    factor as a float (rows x RISK_FACTOR_COLUMNS, NaN when missing) and
+    ``city_rows`` maps each ``cities_df`` row to its state's ``risk_df``
+    row (-1 when the state has no risk data) and ``city_state_risk`` gives
+    that state's risk_index per city (NaN when unknown).
+    """
+
+    def __init__(self, risk_df, cities_df, risk_states_index):
+        rows = risk_df.to_dict('records')
+        self.records = [self._record(row) for row in rows]
+        self.scores = np.array(
+            [[risk_factor_score(col, row.get(col)) for col in RISK_FACTOR_COLUMNS] for row in rows],
+            dtype=float).reshape(len(rows), len(RISK_FACTOR_COLUMNS))
+        self.risk_index = np.array([risk_factor_score('risk_index', row.get('risk_index')) for row in rows],
+                                   dtype=float)
+
+        by_state = {}
+        city_rows = []
+        for state in cities_df['state_name']:
+            if state not in by_state:
+                pos = None if pd.isna(state) else risk_states_index.first(state, partial=False)
+                by_state[state] = -1 if pos is None else pos
+            city_rows.append(by_state[state])
+        self.city_rows = np.array(city_rows, dtype=np.int64)
+        # The state's overall risk_index next to each city's own
+        self.city_state_risk = np.where(
+            self.city_rows >= 0, self.risk_index[np.maximum(self.city_rows, 0)], np.nan)
+
+    @staticmethod
+    def _record(row):
+        health_alerts = row.get('health_alerts', '')
+        safety_suggestions = row.get('safety_suggestions', '')
+        return {
+            'state': row.get('state'),
+            'risk_index': row.get('risk_index', 0),
+            'risks': {col: row[col] for col in RISK_FACTOR_COLUMNS if col in row and _present(row[col])},
+            'health_alerts': health_alerts if pd.notna(health_alerts) and str(health_alerts).strip() != '' else '',
+            'safety_suggestions': safety_suggestions if pd.notna(safety_suggestions) and str(safety_suggestions).strip() != '' else '',
+            'insurance_available': row.get('insurance_available', ''),
+            'major_disaster_years': row.get('major_disaster_years', ''),
+            'hotspot_districts': row.get('hotspot_districts', '')
+        }
+
+    def city_profile(self, city_pos, city_risk):
+        """Risk profile of a ``cities_df`` row: its own risk plus its state's factors."""
+        row = int(self.city_rows[city_pos])
+        profile = {
+            'risk_index': None if pd.isna(city_risk) else float(city_risk),
+            'state_risk_index': None,
+            'factor_scores': {},
+            'state_risks': None,
+        }
+        if row >= 0:
+            scores = self.scores[row]
+            profile['state_risk_index'] = None if np.isnan(self.risk_index[row]) else float(self.risk_index[row])
+            profile['factor_scores'] = {col: float(score) for col, score in zip(RISK_FACTOR_COLUMNS, scores)
+                                        if not np.isnan(score)}
+            profile['state_risks'] = self.records[row]
+        return profile
+
+
+# ---------------------------------------------
+# 🏅 COMPOSITE RANKING (vectorized scoring)
+# ---------------------------------------------
+# Months (1-12) in which a seasonal hazard counts; the other risk factors
+# count all year.
+HAZARD_SEASONS = {
+    'flood_risk': (6, 7, 8, 9),             # south-west monsoon
+    'landslide_risk': (6, 7, 8, 9),
+    'sea_erosion_risk': (6, 7, 8, 9),
+    'cyclone_risk': (4, 5, 10, 11, 12),     # pre- and post-monsoon cyclones
+    'drought_risk': (3, 4, 5, 6),
+    'forest_fire_risk': (2, 3, 4, 5),
+}
+_WORD_RE = re.compile(r'[a-z]+')
+
+
+def word_stems(text):
+    """Lower-case words with a plural "s" dropped ("Beaches" -> "beache")."""
+    words = _WORD_RE.findall(str(text).lower())
+    return [w[:-1] if len(w) > 3 and w.endswith('s') and not w.endswith('ss') else w for w in words]
+
+
+class RankingFeatures:
+    """Per-city arrays the scoring engine reads, all scaled to 0-1.
+
+    ``state_hazard`` is the hazard of each state per month (states x 12):
+    the mean over its risk factors, seasonal ones counting only in their
+    season. ``hazard_rows`` points each city at its state's row.
+    ``keyword_rows`` maps word stems of a place's category, description
+    and attractions to its row positions.
+    """
+
+    def __init__(self, cities_df, states_df, states_index, place_index, risk_profiles):
+        self.rating = np.nan_to_num(place_index.rating / 5.0)
+        # A place without its own risk_index takes its state's
+        risk = np.where(np.isnan(place_index.risk), risk_profiles.city_state_risk, place_index.risk)
+        self.safety = 1.0 - np.nan_to_num(risk, nan=1.0)
+
+        if 'safety_index' in states_df:
+            state_safety = states_df['safety_index'].to_numpy(dtype=float)
+        else:
+            state_safety = np.full(len(states_df), np.nan)
+        by_state = {}
+        for state in cities_df['state_name'].drop_duplicates():
+            pos = None if pd.isna(state) else states_index.first(state, partial=False)
+            by_state[state] = np.nan if pos is None else state_safety[pos]
+        safety = cities_df['state_name'].map(by_state).to_numpy(dtype=float)
+        fallback = np.nanmean(state_safety) if np.isfinite(state_safety).any() else 0.5
+        self.state_safety = np.where(np.isnan(safety), fallback, safety)
+
+        active = np.ones((len(RISK_FACTOR_COLUMNS), 12))
+        for i, col in enumerate(RISK_FACTOR_COLUMNS):
+            if col in HAZARD_SEASONS:
+                active[i] = 0
+                active[i, [m - 1 for m in HAZARD_SEASONS[col]]] = 1
+        scores = risk_profiles.scores
+        known = np.isfinite(scores)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            state_hazard = (np.where(known, scores, 0) @ active) / known.sum(axis=1, keepdims=True)
+        state_hazard = np.nan_to_num(state_hazard, nan=0.5)
+        # city_rows is -1 for states without risk data: the last row, the mean
+        mean_hazard = state_hazard.mean(axis=0) if len(state_hazard) else np.full(12, 0.5)
+        self.state_hazard = np.vstack([state_hazard, mean_hazard])
+        self.hazard_rows = risk_profiles.city_rows
+
+        self.place_index = place_index
+        self.size = len(cities_df)
+        keyword_rows = {}
+        text_columns = [c for c in ('category', 'description', 'top_attractions') if c in cities_df]
+        text = cities_df[text_columns].fillna('').astype(str).agg(' '.join, axis=1)
+        for pos, value in enumerate(text):
+            for stem in set(word_stems(value)):
+                keyword_rows.setdefault(stem, []).append(pos)
+        self.keyword_rows = {stem: np.array(rows, dtype=np.int64) for stem, rows in keyword_rows.items()}
+
+    def interest_rows(self, interest):
+        """Row positions whose text mentions every word of ``interest``."""
+        stems = word_stems(interest)
+        if not stems:
+            return np.empty(0, dtype=np.int64)
+        rows = self.keyword_rows.get(stems[0], np.empty(0, dtype=np.int64))
+        for stem in stems[1:]:
+            rows = np.intersect1d(rows, self.keyword_rows.get(stem, ()), assume_unique=True)
+        return rows
+
+
+RankingQuery = namedtuple('RankingQuery', ['interests', 'month_bits'])
+
+# name -> (feature function, default weight); see ranking_feature
+RANKING_FEATURES = {}
+
+
+def ranking_feature(name, weight):
+    """Register ``fn(features, positions, query)`` -> 0-1 array as a score term."""
+    def register(fn):
+        RANKING_FEATURES[name] = (fn, weight)
+        return fn
+    return register
+
+
+@ranking_feature('rating', 1.0)
+def _rating_feature(features, positions, query):
+    return features.rating[positions]
+
+
+@ranking_feature('risk', 0.5)
+def _city_safety_feature(features, positions, query):
+    # 1 - the place's own risk_index, or its state's when it has none
+    return features.safety[positions]
+
+
+@ranking_feature('state_safety', 0.25)
+def _state_safety_feature(features, positions, query):
+    return features.state_safety[positions]
+
+
+@ranking_feature('hazard', 0.5)
+def _hazard_feature(features, positions, query):
+    months = [m for m in range(12) if query.month_bits >> m & 1] or slice(None)
+    # Average the few state rows first, then gather per place
+    return 1.0 - features.state_hazard[:, months].mean(axis=1)[features.hazard_rows[positions]]
+
+
+@ranking_feature('interest', 0.5)
+def _interest_feature(features, positions, query):
+    # Share of the interests a place matches by category or in its text
+    if not query.interests:
+        return np.zeros(len(positions))
+    codes = features.place_index.category_codes[positions]
+    matched = np.zeros(len(positions))
+    for interest in query.interests:
+        mentioned = np.zeros(features.size, dtype=bool)
+        mentioned[features.interest_rows(interest)] = True
+        code = features.place_index.category_lookup.get(str(interest).strip().lower(), -2)
+        matched += (codes == code) | mentioned[positions]
+    return matched / len(query.interests)
+
+
+def parse_ranking_weights(raw):
+    """Weights from a JSON object or "rating:1,hazard:2" as a tuple in
+    RANKING_FEATURES order; features not given keep their default weight.
+    """
+    if isinstance(raw, str):
+        try:
+            raw = dict(item.split(':', 1) for item in raw.split(',') if item.strip())
+        except ValueError:
+            raise ValueError("'weights' must look like 'rating:1,hazard:0.5'")
+    if not isinstance(raw, dict):
+        raise ValueError("'weights' must be an object of feature weights")
+    unknown = [name for name in raw if str(name).strip() not in RANKING_FEATURES]
+    if unknown:
+        raise ValueError(f"Unknown ranking features: {', '.join(map(str, unknown))} "
+                         f"(known: {', '.join(RANKING_FEATURES)})")
+    weights = {name: weight for name, (_, weight) in RANKING_FEATURES.items()}
+    for name, value in raw.items():
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Weight for '{name}' must be a number")
+        if not np.isfinite(value) or value < 0:
+            raise ValueError(f"Weight for '{name}' must be zero or positive")
+        weights[str(name).strip()] = value
+    return tuple(weights[name] for name in RANKING_FEATURES)
+
+
+def composite_scores(features, positions, query, weights):
+    """Weighted sum of every feature for the rows at ``positions``.
+
+    Features with weight 0 are not computed; the rest are stacked into a
+    (features x rows) matrix and scored with one vector-matrix product.
+    """
+    terms = [(fn, w) for (fn, _), w in zip(RANKING_FEATURES.values(), weights) if w]
+    if not terms or not len(positions):
+        return np.zeros(len(positions))
+    matrix = np.stack([fn(features, positions, query) for fn, _ in terms])
+    return np.array([w for _, w in terms]) @ matrix
+
+
+# ---------------------------------------------
+# 🔄 DATA SNAPSHOTS (hot reload)
+# ---------------------------------------------
+class DataSnapshot:
+    """The datasets plus every index and model derived from them.
+
+    Built in full before it is published and never modified afterwards.
+    Handlers read ``dataset_manager.snapshot`` once per request and use only
+    that object, so a reload in the middle of a request cannot mix rows of
+    one version with positions from another. ``version`` goes up with every
+    reload and is part of the key of caches shared across snapshots.
+    """
+
+    def __init__(self, datasets, version):
+        self.version = version
+        self.source = datasets.source
+        self.states_complete_df = datasets.states_complete
+        self.cities_df = datasets.cities
+        self.risk_df = datasets.risk
+
+        self.states_index = NameIndex(self.states_complete_df['state_name'])
+        self.city_states_index = NameIndex(self.cities_df['state_name'])
+        self.risk_states_index = NameIndex(self.risk_df['state'])
+        self.city_index = build_city_index(self.cities_df)
+        self.place_index = PlaceSearchIndex(self.cities_df, datasets.city_month_masks)
+        self.geo_index = GeoIndex(self.cities_df['latitude'], self.cities_df['longitude'])
+        self.numeric_state_features = self.states_complete_df.select_dtypes('number').columns.tolist()
+        self.state_comparison = build_state_comparison(
+            self.states_complete_df, self.cities_df, self.city_states_index)
+        self.city_comparison = build_city_comparison(self.cities_df)
+        self.risk_profiles = RiskProfiles(self.risk_df, self.cities_df, self.risk_states_index)
+        self.ranking_features = RankingFeatures(self.cities_df, self.states_complete_df, self.states_index,
+                                                self.place_index, self.risk_profiles)
+
+        # Fit every trend model now so the first forecast after a reload
+        # costs no more than any other
+        self.trend_models = TrendModelRegistry(self.states_complete_df)
+        self.trend_models.fit_all()
+
+    def find_city(self, state_name, city_name):
+        """Return the first row of ``cities_df`` for a state/city pair or None."""
+        positions = self.city_index.get((normalize_name(state_name), normalize_name(city_name)))
+        if not positions:
+            return None
+        return self.cities_df.iloc[positions[0]]
+
+
+dataset_manager = DatasetManager(DataSnapshot, log=app.logger)
+
+
+@metrics.collector
+def _collect_dataset_metrics():
+    yield 'dataset_version', 'gauge', 'Version of the data snapshot being served.', [
+        ({}, dataset_manager.version)
+    ]
+
+
+@app.route('/admin/reload', methods=['POST'])
+def reload_datasets():
+    """Reload the data files now instead of waiting for the file watcher.
+
+    Requires an ``X-Admin-Token`` header matching ADMIN_TOKEN (disabled when
+    it is unset). Reloads only the worker process that receives the request;
+    with several workers rely on the watcher (DATA_RELOAD_INTERVAL).
+    """
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "Reload endpoint is disabled (ADMIN_TOKEN not set)"}), 403
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN):
+        return jsonify({"error": "Invalid admin token"}), 403
+    try:
+        snap = dataset_manager.reload()
+    except Exception as e:
+        app.logger.exception("Dataset reload failed")
+        return jsonify({"error": "Reload failed", "details": str(e),
+                        "version": dataset_manager.version}), 500
+    return jsonify({
+        "version": snap.version,
+        "source": snap.source,
+        "states": len(snap.states_complete_df),
+        "cities": len(snap.cities_df),
+        "risk_rows": len(snap.risk_df)
+    })
+
+# ---------------------------------------------
+# 🧊 IN-PROCESS CACHE (TTL + LRU, stale-while-revalidate)
+# ---------------------------------------------
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class TTLCache:
+    """Thread-safe, bounded TTL cache with LRU eviction.
+
+    ``get(key, loader)`` returns a fresh entry directly. An expired entry
+    that is still within ``stale_ttl`` is returned as-is while ``loader`` runs
+    in a background thread to refresh it. Misses call ``loader`` inline;
+    concurrent misses for the same key wait for the first caller's result
+    instead of loading again. Only values accepted by ``should_cache`` are
+    stored, so provider errors are never cached.
+    """
+
+    def __init__(self, ttl, maxsize, stale_ttl=0, should_cache=None):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.maxsize = maxsize
+        self.should_cache = should_cache or (lambda value: True)
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.refresh_errors = 0
+
+    def get(self, key, loader):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                age = now - stored_at
+                if age < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                if age < self.ttl + self.stale_ttl:
+                    self._entries.move_to_end(key)
+                    self.stale_hits += 1
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        threading.Thread(target=self._refresh, args=(key, loader), daemon=True).start()
+                    return value
+                del self._entries[key]
+            pending = self._pending.get(key)
+            if pending is None:
+                self.misses += 1
+                pending = self._pending[key] = Future()
+                owner = True
+            else:
+                self.coalesced += 1
+                owner = False
+
+        if not owner:
+            return pending.result()
+
+        try:
+            value = loader(key)
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        else:
+            self.set(key, value)
+            pending.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def peek(self, key):
+        """Non-blocking lookup for async callers.
+
+        Returns (value, stale) for a cached entry or None on a miss. Hits
+        and stale hits are counted like ``get``; the caller loads, refreshes
+        and reports misses with ``record_miss``.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                age = now - stored_at
+                if age < self.ttl + self.stale_ttl:
+                    self._entries.move_to_end(key)
+                    if age < self.ttl:
+                        self.hits += 1
+                        return value, False
+                    self.stale_hits += 1
+                    return value, True
+                del self._entries[key]
+            return None
+
+    def record_miss(self, coalesced=False):
+        with self._lock:
+            if coalesced:
+                self.coalesced += 1
+            else:
+                self.misses += 1
+
+    def record_refresh_error(self, key, error):
+        with self._lock:
+            self.refresh_errors += 1
+        app.logger.debug('Background refresh for %s failed: %s', key, error)
+
+    def set(self, key, value):
+        if not self.should_cache(value):
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _refresh(self, key, loader):
+        try:
+            self.set(key, loader(key))
+        except Exception as e:
+            self.record_refresh_error(key, e)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses + self.coalesced
+            return {
+                "size": len(self._entries),
+                "max_size": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "stale_ttl_seconds": self.stale_ttl,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "refresh_errors": self.refresh_errors,
+                "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+
+# ---------------------------------------------
+# 🔑 PASSWORD HASHING (bounded process pool)
+# ---------------------------------------------
+from passwords import HasherBusy, PasswordHasher
+
+# bcrypt work factor (cost doubles with each step) and pool sizing. Both
+# limits are per process, so under gunicorn each worker has its own pool: a
+# login storm can keep at most AUTH_POOL_SIZE cores busy per worker, and a
+# worker with more than AUTH_MAX_PENDING concurrent hash/verify jobs answers
+# the rest with a 503 straight away.
+BCRYPT_LOG_ROUNDS = int(os.getenv("BCRYPT_LOG_ROUNDS", 12))
+AUTH_POOL_SIZE = int(os.getenv("AUTH_POOL_SIZE", 2))
+AUTH_MAX_PENDING = int(os.getenv("AUTH_MAX_PENDING", AUTH_POOL_SIZE * 8))
+AUTH_TIMEOUT = float(os.getenv("AUTH_TIMEOUT", 10))
+
+password_hasher = PasswordHasher(
+    pool_size=AUTH_POOL_SIZE,
+    rounds=BCRYPT_LOG_ROUNDS,
+    max_pending=AUTH_MAX_PENDING,
+    timeout=AUTH_TIMEOUT
+)
+PASSWORD_HASH_LATENCY = metrics.histogram(
+    'password_hash_duration_seconds', 'bcrypt job latency including time queued for the pool.',
+    ['operation', 'outcome'])
+
+
+@metrics.collector
+def _collect_password_hasher_metrics():
+    stats = password_hasher.stats()
+    yield 'password_hash_in_flight', 'gauge', 'bcrypt jobs queued or running.', [({}, stats['in_flight'])]
+    yield 'password_hash_rejected_total', 'counter', 'bcrypt jobs refused by admission control.', [
+        ({}, stats['rejected'])
+    ]
+    yield 'password_hash_timeouts_total', 'counter', 'bcrypt jobs the caller stopped waiting for.', [
+        ({}, stats['timeouts'])
+    ]
+
+
+def _run_password_job(operation, fn, *args):
+    started = time.perf_counter()
+    outcome = 'ok'
+    try:
+        return fn(*args)
+    except HasherBusy:
+        outcome = 'busy'
+        raise
+    except Exception:
+        outcome = 'error'
+        raise
+    finally:
+        PASSWORD_HASH_LATENCY.observe(time.perf_counter() - started, operation, outcome)
+
+
+def hash_password(password):
+    return _run_password_job('hash', password_hasher.hash, password)
+
+
+def check_password(pw_hash, password):
+    return _run_password_job('check', password_hasher.check, pw_hash, password)
+
+
+def _auth_busy_response():
+    response = jsonify({"error": "Too many authentication requests in progress, please retry shortly"})
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
+
+# ---------------------------------------------
+# 🎫 SESSION TOKENS & USER PROFILE CACHE
+# ---------------------------------------------
+import secrets
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+# Tokens are signed with SECRET_KEY and verified in memory, so authenticated
+# requests need neither bcrypt nor a database lookup. Without SECRET_KEY a
+# random key is generated at import: gunicorn workers share it (the app is
+# preloaded), but every restart logs everyone out.
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", 12 * 3600))
+app.secret_key = os.getenv("SECRET_KEY")
+if not app.secret_key:
+    app.secret_key = secrets.token_hex(32)
+    app.logger.warning("SECRET_KEY is not set; session tokens will not survive a restart.")
+session_signer = URLSafeTimedSerializer(app.secret_key, salt="session-token")
+
+
+def issue_session_token(username):
+    return session_signer.dumps({"u": username})
+
+
+def verify_session_token(token):
+    """Return the username a valid, unexpired token was issued to, else None."""
+    try:
+        payload = session_signer.loads(token, max_age=SESSION_TTL_SECONDS)
+    except BadSignature:
+        return None
+    return payload.get("u") if isinstance(payload, dict) else None
+
+
+def authenticated_user():
+    """Return (username, error_response) for the request's bearer token.
+
+    (None, None) when no Authorization header was sent.
+    """
+    header = request.headers.get('Authorization', '')
+    if not header:
+        return None, None
+    scheme, _, token = header.partition(' ')
+    username = verify_session_token(token.strip()) if scheme.lower() == 'bearer' else None
+    if username is None:
+        return None, (jsonify({"error": "Invalid or expired session token"}), 401)
+    return username, None
+
+
+def authorize_user(username, required=False):
+    """Return an error response unless the request may act as ``username``.
+
+    A token for another user is always refused; ``required`` also refuses
+    requests without a token.
+    """
+    token_user, error = authenticated_user()
+    if error:
+        return error
+    if required and token_user is None:
+        return jsonify({"error": "Authentication required"}), 401
+    if token_user is not None and token_user != username:
+        return jsonify({"error": "Token does not belong to this user"}), 403
+    return None
+
+
+# Profiles are read far more often than they change. Updates through this
+# process drop the cached entry; other workers see them within the TTL.
+USER_PROFILE_FIELDS = {"_id": 0, "username": 1, "email": 1, "interests": 1}
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", 60))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 4096))
+
+# Unknown users are not cached, so a new registration shows up at once
+user_profile_cache = TTLCache(ttl=USER_CACHE_TTL, maxsize=USER_CACHE_SIZE,
+                              should_cache=lambda profile: profile is not None)
+register_cache_metrics('user_profiles', user_profile_cache)
+
+
+def get_user_profile(username):
+    """Return the cached profile (no password) for ``username`` or None."""
+    return user_profile_cache.get(
+        username, lambda name: users_collection.find_one({"username": name}, USER_PROFILE_FIELDS))
 
-states_complete_df = pd.read_csv(os.path.join(BASE_DIR, "data", "states_complete.csv"))
-cities_df = pd.read_csv(os.path.join(BASE_DIR, "data", "cities.csv"))
-risk_df = pd.read_csv(os.path.join(BASE_DIR, "data", "risk_data.csv"))
 
-if 'state_name' in cities_df.columns:
-    cities_df['state_name'] = cities_df['state_name'].str.strip()
 # ---------------------------------------------
 # 🔐 USER AUTHENTICATION (Register / Login)
 # ---------------------------------------------
@@ -63,7 +1587,7 @@ from datetime import datetime
 
 @app.route('/register', methods=['GET', 'POST'])
 def register():
-    if users_collection is None:
+    if not mongo_ready():
         return jsonify({"error": "User registration is currently unavailable"}), 503
 
     # Handle GET request to show example usage
@@ -91,12 +1615,14 @@ def register():
         return jsonify({"error": "Username, email and password are required"}), 400
 
     try:
-        # Check if username or email exists
-        if users_collection.find_one({"$or": [{"username": username}, {"email": email}]}):
+        # With the unique indexes in place the insert itself rejects
+        # duplicates atomically; without them, check first
+        if not user_indexes_ready and users_collection.find_one(
+                {"$or": [{"username": username}, {"email": email}]}, {"_id": 1}):
             return jsonify({"error": "Username or Email already exists"}), 409
 
-        # Hash password (using bcrypt as in your original)
-        hashed_pw = bcrypt.generate_password_hash(password).decode('utf-8')
+        # Hash password (bcrypt, in the hashing pool)
+        hashed_pw = hash_password(password)
 
         # Insert user document including interests and createdAt timestamp
         users_collection.insert_one({
@@ -106,17 +1632,23 @@ def register():
             "interests": interests,
             "createdAt": datetime.utcnow()
         })
+        user_profile_cache.set(username, {"username": username, "email": email, "interests": interests})
 
         return jsonify({"message": "User registered successfully."}), 201
+    except DuplicateKeyError:
+        return jsonify({"error": "Username or Email already exists"}), 409
+    except HasherBusy:
+        return _auth_busy_response()
     except Exception as e:
-        print(f"Database operation failed: {str(e)}")
+        app.logger.exception("Database operation failed during registration")
         return jsonify({"error": "Registration failed due to database error"}), 503
 
 @app.route('/interests', methods=['GET'])
 def get_interests():
+    snap = dataset_manager.snapshot
     try:
         # Get unique categories from the actual dataset
-        unique_categories = cities_df['category'].dropna().unique().tolist()
+        unique_categories = snap.cities_df['category'].dropna().unique().tolist()
         # Sort them for better user experience
         unique_categories.sort()
         return jsonify({
@@ -125,7 +1657,7 @@ def get_interests():
             "count": len(unique_categories)
         })
     except Exception as e:
-        print(f"Error fetching interests: {str(e)}")
+        app.logger.exception("Error fetching interests")
         return jsonify({
             "status": "error",
             "message": "Failed to fetch interests",
@@ -135,7 +1667,7 @@ def get_interests():
 
 @app.route('/login', methods=['POST'])
 def login():
-    if users_collection is None:
+    if not mongo_ready():
         return jsonify({"error": "Login service is currently unavailable"}), 503
 
     data = request.get_json()
@@ -143,13 +1675,21 @@ def login():
     password = data.get("password")
 
     try:
-        user = users_collection.find_one({"username": username})
-        if not user or not bcrypt.check_password_hash(user["password"], password):
+        user = users_collection.find_one({"username": username}, {"password": 1, "_id": 0})
+        if not user or not check_password(user["password"], password):
             return jsonify({"error": "Invalid credentials"}), 401
 
-        return jsonify({"message": "Login successful", "username": username})
+        return jsonify({
+            "message": "Login successful",
+            "username": username,
+            "token": issue_session_token(username),
+            "token_type": "Bearer",
+            "expires_in": SESSION_TTL_SECONDS
+        })
+    except HasherBusy:
+        return _auth_busy_response()
     except Exception as e:
-        print(f"Login failed: {str(e)}")
+        app.logger.exception("Login failed")
         return jsonify({"error": "Login failed due to database error"}), 503
 
 
@@ -164,10 +1704,23 @@ def home():
 # Get or update user interests
 @app.route('/user/<username>/interests', methods=['GET', 'PUT', 'POST'])
 def user_interests(username):
+    """Read or update a user's interests.
+
+    Reads are served from the profile cache. Updates require an
+    ``Authorization: Bearer <token>`` header from /login for this user; an
+    invalid token is rejected on reads too.
+    """
+    error = authorize_user(username, required=request.method != 'GET')
+    if error:
+        return error
+
+    if not mongo_ready():
+        return jsonify({"error": "User service is currently unavailable"}), 503
+
     # GET: return the user's interests
     if request.method == 'GET':
-        user = users_collection.find_one({"username": username}, {"password": 0})
-        if not user:
+        user = get_user_profile(username)
+        if user is None:
             return jsonify({"error": "User not found"}), 404
         # Ensure interests key exists
         interests = user.get('interests', [])
@@ -189,27 +1742,25 @@ def user_interests(username):
 
     if result.matched_count == 0:
         return jsonify({"error": "User not found"}), 404
+    user_profile_cache.discard(username)
     return jsonify({"message": "User interests updated successfully.", "username": username, "interests": interests})
 
 # Get list of states
 @app.route('/states', methods=['GET'])
 def get_states():
-    return jsonify(states_complete_df['state_name'].tolist())
+    snap = dataset_manager.snapshot
+    return jsonify(snap.states_complete_df['state_name'].tolist())
 
 # Get state details
 @app.route('/states/<state_name>', methods=['GET'])
 def state_details(state_name):
-    # Try exact match first
-    df = states_complete_df[states_complete_df['state_name'].str.lower() == state_name.lower()]
-    
-    # If no exact match, try partial match
-    if df.empty:
-        df = states_complete_df[states_complete_df['state_name'].str.lower().str.contains(state_name.lower(), na=False)]
-    
-    if df.empty:
+    snap = dataset_manager.snapshot
+    # Exact match first, then space-insensitive / partial match via the index
+    pos = snap.states_index.first(state_name)
+    if pos is None:
         abort(404)
     # Return all state details except tourism trend columns for brevity
-    state_data = df.iloc[0].to_dict()
+    state_data = snap.states_complete_df.iloc[pos].to_dict()
     # Remove tourism-related columns from main details
     for col in list(state_data.keys()):
         if col.startswith('tourism_'):
@@ -218,13 +1769,14 @@ def state_details(state_name):
 
 @app.route('/cities', methods=['GET'])
 def get_all_cities():
+    snap = dataset_manager.snapshot
     try:
         # Extract unique city names from cities_df
-        cities_list = cities_df['city_name'].dropna().unique().tolist()
+        cities_list = snap.cities_df['city_name'].dropna().unique().tolist()
         cities_list.sort()
         return jsonify({"status": "success", "cities": cities_list})
     except Exception as e:
-        print(f"Error fetching all cities: {str(e)}")
+        app.logger.exception("Error fetching all cities")
         return jsonify({"status": "error", "message": "Failed to fetch cities"}), 500
 
 
@@ -232,25 +1784,15 @@ def get_all_cities():
 # Risk data for state
 @app.route('/states/<state_name>/risk', methods=['GET'])
 def state_risk(state_name):
+    snap = dataset_manager.snapshot
     try:
-        # Try multiple matching strategies for robust state name matching
-        # 1. Exact case-insensitive match
-        df = risk_df[risk_df['state'].str.strip().str.lower() == state_name.strip().lower()]
-        
-        # 2. If no match, try partial match
-        if df.empty:
-            df = risk_df[risk_df['state'].str.strip().str.lower().str.contains(state_name.strip().lower(), na=False)]
-        
-        # 3. Try with normalized spaces removed
-        if df.empty:
-            state_normalized = state_name.strip().lower().replace(' ', '')
-            df = risk_df[risk_df['state'].str.strip().str.lower().str.replace(' ', '') == state_normalized]
-        
-        if df.empty:
+        # Exact, space-insensitive and partial matching via the prebuilt index
+        pos = snap.risk_states_index.first(state_name)
+
+        if pos is None:
             # Log available states for debugging
-            available_states = risk_df['state'].dropna().unique().tolist()
-            print(f"[DEBUG] No match for state_name='{state_name}'")
-            print(f"[DEBUG] Available states: {available_states}")
+            app.logger.info("No risk data for state_name=%r", state_name)
+            app.logger.debug("Available states: %s", snap.risk_states_index.keys())
             
             # Return empty but valid response instead of 404
             return jsonify({
@@ -264,55 +1806,11 @@ def state_risk(state_name):
                 'hotspot_districts': ''
             })
         
-        risk_data = df.iloc[0].to_dict()
-        
-        # Extract specific fields
-        health_alerts = risk_data.get('health_alerts', '')
-        safety_suggestions = risk_data.get('safety_suggestions', '')
-        
-        # Filter risk types - include ALL non-null, non-empty values
-        filtered_risks = {}
-        risk_columns = [
-            'flood_risk', 'landslide_risk', 'earthquake_zone', 
-            'crime_rate', 'accident_rate', 'cyclone_risk', 
-            'drought_risk', 'forest_fire_risk', 'sea_erosion_risk'
-        ]
-        
-        for col in risk_columns:
-            if col not in risk_data:
-                continue
-                
-            value = risk_data[col]
-            
-            # Skip only if value is null, undefined, or empty/NaN string
-            if pd.isna(value):
-                continue
-            
-            # Convert to string for checking
-            str_value = str(value).strip()
-            
-            # Skip empty strings or "nan" strings
-            if str_value == '' or str_value.lower() == 'nan':
-                continue
-            
-            # Include ALL other values (numbers including 0, and strings like "Zone III")
-            filtered_risks[col] = value
-        
-        return jsonify({
-            'state': risk_data.get('state', state_name),
-            'risk_index': risk_data.get('risk_index', 0),
-            'risks': filtered_risks,
-            'health_alerts': health_alerts if pd.notna(health_alerts) and str(health_alerts).strip() != '' else '',
-            'safety_suggestions': safety_suggestions if pd.notna(safety_suggestions) and str(safety_suggestions).strip() != '' else '',
-            'insurance_available': risk_data.get('insurance_available', ''),
-            'major_disaster_years': risk_data.get('major_disaster_years', ''),
-            'hotspot_districts': risk_data.get('hotspot_districts', '')
-        })
-        
+        # Cleaned and null-filtered once per snapshot (RiskProfiles)
+        return jsonify(snap.risk_profiles.records[pos])
+
     except Exception as e:
-        print(f"[ERROR] in state_risk endpoint: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        app.logger.exception("Error in state_risk endpoint")
         return jsonify({
             'state': state_name,
             'risk_index': 0,
@@ -328,222 +1826,751 @@ def state_risk(state_name):
 # Tourism trends from states_complete.csv based on actual visitor data
 @app.route('/states/<state_name>/tourism_trends', methods=['GET'])
 def tourism_trends_data(state_name):
-    # Try exact match first
-    df = states_complete_df[states_complete_df['state_name'].str.lower() == state_name.lower()]
-    
-    # If no exact match, try partial match
-    if df.empty:
-        df = states_complete_df[states_complete_df['state_name'].str.lower().str.contains(state_name.lower(), na=False)]
-    
-    if df.empty:
+    snap = dataset_manager.snapshot
+    pos = snap.states_index.first(state_name)
+    if pos is None:
         abort(404)
+    row = snap.states_complete_df.iloc[pos]
     
     # Get visitor columns (visitors_2020, visitors_2021, etc.)
-    visitor_cols = [c for c in df.columns if c.startswith('visitors_')]
+    visitor_cols = [c for c in snap.states_complete_df.columns if c.startswith('visitors_')]
     trends = {}
     
     for col in visitor_cols:
         year = col.split('_')[1]  # Extract year from column name
-        trends[year] = int(df.iloc[0][col]) if pd.notna(df.iloc[0][col]) else 0
+        trends[year] = int(row[col]) if pd.notna(row[col]) else 0
     
     return jsonify(trends)
 
 # Cities in a state
 @app.route('/states/<state_name>/cities', methods=['GET'])
 def state_cities(state_name):
+    snap = dataset_manager.snapshot
     try:
-        # Try multiple matching strategies
-        # 1. Exact match (case-insensitive)
-        df = cities_df[cities_df['state_name'].str.lower() == state_name.lower()]
+        # Exact, space-insensitive and partial matching via the prebuilt index
+        with FILTER_LATENCY.time('state_cities'):
+            positions = snap.city_states_index.positions(state_name)
         
-        # 2. If no exact match, try partial match
-        if df.empty:
-            df = cities_df[cities_df['state_name'].str.lower().str.contains(state_name.lower(), na=False)]
-        
-        # 3. If still empty, try with spaces removed
-        if df.empty:
-            state_normalized = state_name.lower().replace(' ', '')
-            df = cities_df[cities_df['state_name'].str.lower().str.replace(' ', '') == state_normalized]
-        
-        if df.empty:
+        if not positions:
             # Log available states for debugging
-            available_states = cities_df['state_name'].unique().tolist()
-            print(f"No cities found for state: {state_name}")
-            print(f"Available states in cities.csv: {available_states}")
+            app.logger.info("No cities found for state: %s", state_name)
+            app.logger.debug("Available states in cities.csv: %s", snap.city_states_index.keys())
             # Return empty array instead of 404 to avoid breaking frontend
             return jsonify([])
-        df.drop_duplicates(subset=['city_name'], inplace=True)
-        df.sort_values('city_name', inplace=True)
+        df = snap.cities_df.iloc[positions]
+        df = df.drop_duplicates(subset=['city_name'])
+        df = df.sort_values('city_name')
         
-        # Convert NaN to None for proper JSON conversion
-        df = df.where(pd.notnull(df), None)
+        # NaN becomes None for proper JSON conversion
+        cities_objects = dataframe_to_records(df)
         
-        cities_objects = df.to_dict(orient='records')
-        
-        print(f"Found {len(cities_objects)} cities for state: {state_name}")
+        app.logger.debug("Found %d cities for state: %s", len(cities_objects), state_name)
         return jsonify(cities_objects)
         
     except Exception as e:
-        print(f"Error in state_cities endpoint: {str(e)}")
+        app.logger.exception("Error in state_cities endpoint")
         return jsonify([])
 
 # City details
 @app.route('/states/<state_name>/cities/<city_name>', methods=['GET'])
 def city_details(state_name, city_name):
-    df = cities_df[(cities_df['state_name'].str.lower() == state_name.lower()) &
-                   (cities_df['city_name'].str.lower() == city_name.lower())]
-    if df.empty:
+    snap = dataset_manager.snapshot
+    row = snap.find_city(state_name, city_name)
+    if row is None:
         abort(404)
-    return jsonify(df.iloc[0].to_dict())
+    return jsonify(row.to_dict())
+
+
+@app.route('/states/<state_name>/cities/<city_name>/risk', methods=['GET'])
+def city_risk(state_name, city_name):
+    """The city's own risk_index joined with its state's risk profile."""
+    snap = dataset_manager.snapshot
+    positions = snap.city_index.get((normalize_name(state_name), normalize_name(city_name)))
+    if not positions:
+        abort(404)
+    pos = positions[0]
+    row = snap.cities_df.iloc[pos]
+    profile = snap.risk_profiles.city_profile(pos, row['risk_index'])
+    return jsonify({'state': row['state_name'], 'city': row['city_name'], **profile})
 
 # Search places with filters
 @app.route('/search_places', methods=['GET'])
 def search_places():
+    """Filter places by category, month, rating and risk.
+
+    Optional: ``limit``/``cursor`` pagination, ``fields`` projection and
+    ``sort`` (a numeric column, prefix with ``-`` for descending). The body
+    stays a list; ``X-Total-Count`` and ``X-Next-Cursor`` headers describe
+    the page.
+    """
+    snap = dataset_manager.snapshot
+    try:
+        limit, offset, fields = parse_page_params(request.args, snap.cities_df.columns)
+        min_rating = _float_arg(request.args, 'min_rating', 0)
+        max_risk = _float_arg(request.args, 'max_risk', 1)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    sort = request.args.get('sort')
+    sort_column = sort.lstrip('-') if sort else None
+    if sort_column and (sort_column not in snap.cities_df.columns or
+                        not pd.api.types.is_numeric_dtype(snap.cities_df[sort_column])):
+        return jsonify({"error": f"Cannot sort by '{sort_column}'"}), 400
+
     category = request.args.get('category')
     month = request.args.get('month')
-    min_rating = float(request.args.get('min_rating', 0))
-    max_risk = float(request.args.get('max_risk', 1))
-    filtered = cities_df
-
-    if category:
-        filtered = filtered[filtered['category'].str.lower() == category.lower()]
-    filtered = filtered[filtered['tourist_rating'] >= min_rating]
-    filtered = filtered[filtered['risk_index'] <= max_risk]
-    if month:
-        m = month.lower()
-        # Improved month filtering - check both best_time_to_visit and popular_months
-        month_mask = (
-            filtered['best_time_to_visit'].str.lower().str.contains(m, na=False) |
-            filtered['popular_months'].str.lower().str.contains(m, na=False)
+
+    # Month matches either best_time_to_visit (as a range) or popular_months
+    with FILTER_LATENCY.time('search_places'):
+        positions = snap.place_index.filter(
+            categories=[category] if category else None,
+            month=month,
+            min_rating=min_rating,
+            max_risk=max_risk
         )
-        filtered = filtered[month_mask]
+        filtered = snap.cities_df.iloc[positions]
     if filtered.empty:
         return jsonify({"message": "No places found matching criteria."})
-    return jsonify(filtered.to_dict(orient='records'))
+
+    total = len(filtered)
+    if sort_column:
+        k = None if limit is None else offset + limit
+        filtered = select_top(filtered, sort_column, k, ascending=not sort.startswith('-'))
+    page, next_cursor = paginate(filtered, offset, limit, total)
+
+    response = jsonify(dataframe_to_records(page, columns=fields))
+    response.headers['X-Total-Count'] = str(total)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+NEARBY_DEFAULT_K = 10
+
+
+def _float_arg(params, name, default=None, low=None, high=None):
+    value = params.get(name)
+    if value is None or value == '':
+        return default
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"'{name}' must be a number")
+    if not np.isfinite(value):
+        raise ValueError(f"'{name}' must be a finite number")
+    if low is not None and value < low or high is not None and value > high:
+        if high is None:
+            raise ValueError(f"'{name}' must be at least {low:g}")
+        if low is None:
+            raise ValueError(f"'{name}' must be at most {high:g}")
+        raise ValueError(f"'{name}' must be between {low:g} and {high:g}")
+    return value
+
+
+def _int_arg(params, name, default=None, low=None, high=None):
+    value = _float_arg(params, name, default, low, high)
+    if value is not None and value != int(value):
+        raise ValueError(f"'{name}' must be an integer")
+    return value if value is None else int(value)
+
+
+@app.route('/places/nearby', methods=['GET'])
+def places_nearby():
+    """Places closest to a point, nearest first.
+
+    The origin is ``lat``/``lon``, or ``state``/``city`` to search around a
+    city (which is then left out of the results). ``radius_km`` limits the
+    distance and ``k`` (default 10) the number of places; ``category``,
+    ``month``, ``min_rating`` and ``max_risk`` filter as in /search_places
+    but only when given. ``fields`` selects columns; every place also gets
+    ``distance_km``.
+    """
+    snap = dataset_manager.snapshot
+    args = request.args
+    try:
+        _, _, fields = parse_page_params({'fields': args.get('fields')}, snap.cities_df.columns)
+        k = _int_arg(args, 'k', NEARBY_DEFAULT_K, 1, MAX_PAGE_SIZE)
+        radius_km = _float_arg(args, 'radius_km', None, 0, np.pi * EARTH_RADIUS_KM)
+        min_rating = _float_arg(args, 'min_rating', None, 0, 5)
+        max_risk = _float_arg(args, 'max_risk', None, 0, 1)
+        lat = _float_arg(args, 'lat', None, -90, 90)
+        lon = _float_arg(args, 'lon', None, -180, 180)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    exclude = None
+    if args.get('state') and args.get('city'):
+        exclude = snap.city_index.get((normalize_name(args['state']), normalize_name(args['city'])))
+        if not exclude:
+            return jsonify({"error": "City not found"}), 404
+        origin = snap.cities_df.iloc[exclude[0]]
+        lat, lon = float(origin['latitude']), float(origin['longitude'])
+        if not (np.isfinite(lat) and np.isfinite(lon)):
+            return jsonify({"error": "City has no coordinates"}), 404
+    elif lat is None or lon is None:
+        return jsonify({"error": "Provide lat and lon, or state and city"}), 400
+
+    category = args.get('category')
+    criteria = {
+        'categories': [category] if category else None,
+        'month': args.get('month'),
+        'min_rating': min_rating,
+        'max_risk': max_risk,
+    }
+
+    def accept(positions):
+        mask = snap.place_index.match(positions, **criteria)
+        if exclude:
+            mask &= ~np.isin(positions, exclude)
+        return mask
+
+    with FILTER_LATENCY.time('places_nearby'):
+        positions, distances = snap.geo_index.nearest(lat, lon, k=k, radius_km=radius_km, accept=accept)
+
+    places = dataframe_to_records(snap.cities_df.iloc[positions], columns=fields)
+    for place, distance in zip(places, distances.tolist()):
+        place['distance_km'] = round(distance, 3)
+    return jsonify({
+        "origin": {"lat": lat, "lon": lon},
+        "radius_km": radius_km,
+        "count": len(places),
+        "places": places
+    })
+
+RECOMMENDATION_COLUMNS = [
+    'state_name', 'city_name', 'category', 'description', 'tourist_rating', 'risk_index',
+    'best_time_to_visit', 'popular_months', 'latitude', 'longitude'
+]
+RECOMMENDATION_FLOAT_COLUMNS = {'tourist_rating', 'risk_index', 'latitude', 'longitude'}
+
+# Ranked results are shared by every request with the same (normalized)
+# filters, whoever sends them, and dropped when a new data snapshot goes live.
+RECOMMENDATION_CACHE_TTL = float(os.getenv("RECOMMENDATION_CACHE_TTL", 3600))
+RECOMMENDATION_CACHE_SIZE = int(os.getenv("RECOMMENDATION_CACHE_SIZE", 1024))
+
+recommendation_cache = TTLCache(ttl=RECOMMENDATION_CACHE_TTL, maxsize=RECOMMENDATION_CACHE_SIZE)
+register_cache_metrics('recommendations', recommendation_cache)
+dataset_manager.add_listener(lambda snap: recommendation_cache.clear())
+
+
+# Ranked row positions plus their composite scores (None when ranked by rating)
+Ranking = namedtuple('Ranking', ['positions', 'scores', 'weights'])
+
+
+def ranked_recommendations(snap, interests, month='', max_risk=1.0, min_rating=0, weights=None):
+    """Places matching the filters as a Ranking, best first.
+
+    Matches ANY of the interests, then month (popular_months only), risk
+    (0-10 scale) and rating. Without ``weights`` places are ordered by
+    tourist_rating; with a weight tuple from ``parse_ranking_weights`` by
+    their composite score. Cached per snapshot version, filter set and
+    weights; interests and month are normalized the way the place index
+    compares them, so ["Beach", "hill station"] and ["Hill Station",
+    "beach"] share an entry.
+    """
+    key = (
+        snap.version,
+        tuple(sorted({str(i).strip().lower() for i in interests})),
+        str(month or '').strip().lower(),
+        float(max_risk),
+        float(min_rating),
+        weights,
+    )
+    return recommendation_cache.get(key, lambda k: _rank_places(snap, *k[1:]))
+
+
+def _rank_places(snap, categories, month, max_risk, min_rating, weights):
+    with FILTER_LATENCY.time('recommend'):
+        positions = snap.place_index.filter(
+            categories=categories,
+            month=month,
+            popular_only=True,
+            min_rating=min_rating,
+            max_risk=max_risk,
+            risk_scale=10
+        )
+        if weights is None:
+            scores = None
+            key = snap.place_index.rating[positions]
+        else:
+            query = RankingQuery(categories, month_query_bits(month) if month else 0)
+            scores = composite_scores(snap.ranking_features, positions, query, weights)
+            key = scores
+        # Stable, so equal scores keep their table order
+        order = np.argsort(-key, kind='stable')
+        ranked = positions[order]
+    ranked.flags.writeable = False
+    if scores is not None:
+        scores = scores[order]
+        scores.flags.writeable = False
+    return Ranking(ranked, scores, weights)
+
+
+def recommendations_payload(snap, ranking, offset, limit, fields):
+    positions = ranking.positions
+    page, next_cursor = page_positions(positions, offset, limit)
+    recommendations = dataframe_to_records(
+        snap.cities_df.iloc[page],
+        columns=fields or RECOMMENDATION_COLUMNS,
+        float_columns=RECOMMENDATION_FLOAT_COLUMNS,
+        fill=''
+    )
+    payload = {
+        'recommendations': recommendations,
+        'count': len(recommendations),
+        'total': len(positions),
+        'next_cursor': next_cursor
+    }
+    if ranking.scores is not None:
+        for record, score in zip(recommendations, ranking.scores[offset:offset + len(page)].tolist()):
+            record['score'] = round(score, 4)
+        payload['weights'] = dict(zip(RANKING_FEATURES, ranking.weights))
+    return payload
+
 
 # Basic AI recommendation (rule-based example)
 @app.route('/recommend', methods=['POST'])
 def recommend():
+    """Places matching ``interests`` (plus ``month``, ``max_risk`` on a 0-10
+    scale and ``min_rating``), highest rated first.
+
+    With ``weights`` (e.g. ``{"rating": 1, "hazard": 2}``, any of
+    RANKING_FEATURES; omitted ones keep their defaults) places are ranked
+    by composite score instead and each carries its ``score``.
+    """
+    snap = dataset_manager.snapshot
     try:
         data = request.json
+        try:
+            limit, offset, fields = parse_page_params(data, RECOMMENDATION_COLUMNS)
+            weights = data.get('weights')
+            weights = None if weights is None else parse_ranking_weights(weights)
+            max_risk = _float_arg(data, 'max_risk', 1.0)
+            min_rating = _float_arg(data, 'min_rating', 0)
+        except ValueError as e:
+            return jsonify({'error': str(e), 'recommendations': []}), 400
+
         interests = data.get('interests', [])  # List of interests
         month = data.get('month', '')
-        max_risk = data.get('max_risk', 1.0)
-        min_rating = data.get('min_rating', 0)
 
-        print(f"[RECOMMEND] Received {len(interests)} interests: {interests}")
+        app.logger.debug("[RECOMMEND] Received %d interests: %s", len(interests), interests)
 
         if not interests:
             return jsonify({'recommendations': [], 'message': 'No interests provided'})
 
-        # ✅ KEY FIX: Use .isin() to match ANY of the selected interests
-        filtered_cities = cities_df[cities_df['category'].isin(interests)].copy()
-        
-        print(f"[RECOMMEND] Found {len(filtered_cities)} cities matching interests")
+        ranking = ranked_recommendations(snap, interests, month, max_risk, min_rating, weights)
+        app.logger.debug("[RECOMMEND] Found %d cities matching filters", len(ranking.positions))
 
-        # Apply month filter if specified
-        if month:
-            filtered_cities = filtered_cities[
-                filtered_cities['popular_months'].str.contains(month, case=False, na=False)
-            ]
+        payload = recommendations_payload(snap, ranking, offset, limit, fields)
+        app.logger.debug("[RECOMMEND] Returning %d recommendations", payload['count'])
+        return jsonify(payload)
 
-        # Apply risk filter
-        filtered_cities = filtered_cities[
-            (filtered_cities['risk_index'] * 10) <= max_risk
-        ]
+    except Exception as e:
+        app.logger.exception("Error in recommend")
+        return jsonify({'error': str(e), 'recommendations': []}), 500
 
-        # Apply rating filter
-        filtered_cities = filtered_cities[
-            filtered_cities['tourist_rating'] >= min_rating
-        ]
 
-        # Sort by rating (highest first)
-        filtered_cities = filtered_cities.sort_values('tourist_rating', ascending=False)
-
-        # Convert to list
-        recommendations = []
-        for _, row in filtered_cities.iterrows():
-            recommendations.append({
-                'state_name': row['state_name'],
-                'city_name': row['city_name'],
-                'category': row['category'],
-                'description': row.get('description', ''),
-                'tourist_rating': float(row['tourist_rating']) if pd.notna(row['tourist_rating']) else 0,
-                'risk_index': float(row['risk_index']) if pd.notna(row['risk_index']) else 0,
-                'best_time_to_visit': row.get('best_time_to_visit', ''),
-                'popular_months': row.get('popular_months', ''),
-                'latitude': float(row['latitude']) if pd.notna(row['latitude']) else 0,
-                'longitude': float(row['longitude']) if pd.notna(row['longitude']) else 0
-            })
+@app.route('/user/<username>/recommendations', methods=['GET'])
+def user_recommendations(username):
+    """Recommendations for the interests stored on the user's profile.
 
-        print(f"[RECOMMEND] Returning {len(recommendations)} recommendations")
+    Saves the client from fetching the interests and posting them back to
+    /recommend. Query params: ``month``, ``max_risk`` and ``min_rating``
+    (same scale and defaults as /recommend, so both share ranking-cache
+    entries) and ``limit``/``cursor``/``fields`` as for /recommend, whose
+    response shape (plus ``username`` and ``interests``) this returns. ``weights`` ("rating:1,hazard:2") switches
+    to composite ranking as for /recommend.
+    """
+    snap = dataset_manager.snapshot
+    error = authorize_user(username)
+    if error:
+        return error
+    try:
+        limit, offset, fields = parse_page_params(request.args, RECOMMENDATION_COLUMNS)
+        max_risk = _float_arg(request.args, 'max_risk', 1.0)
+        min_rating = _float_arg(request.args, 'min_rating', 0)
+        weights = request.args.get('weights')
+        weights = None if weights is None else parse_ranking_weights(weights)
+    except ValueError as e:
+        return jsonify({'error': str(e), 'recommendations': []}), 400
+    month = request.args.get('month', '')
+
+    if not mongo_ready():
+        return jsonify({"error": "User service is currently unavailable"}), 503
+    try:
+        user = get_user_profile(username)
+    except Exception:
+        app.logger.exception("Failed to load profile for recommendations")
+        return jsonify({"error": "User service is currently unavailable"}), 503
+    if user is None:
+        return jsonify({"error": "User not found"}), 404
 
-        return jsonify({
-            'recommendations': recommendations,
-            'count': len(recommendations)
-        })
+    interests = user.get('interests') or []
+    if not interests:
+        return jsonify({'username': username, 'interests': [], 'recommendations': [],
+                        'message': 'No interests saved for this user'})
+
+    ranking = ranked_recommendations(snap, interests, month, max_risk, min_rating, weights)
+    payload = recommendations_payload(snap, ranking, offset, limit, fields)
+    payload.update(username=username, interests=interests)
+    return jsonify(payload)
+
+
+# ---------------------------------------------
+# 🧭 ITINERARY PLANNER (orienteering heuristic)
+# ---------------------------------------------
+ITINERARY_MAX_DAYS = 30
+# Only the best-scoring candidates are handed to the solver
+ITINERARY_MAX_CANDIDATES = 50
+# Planning assumptions: a day at every stop and this many straight-line
+# kilometres of travel per day.
+ITINERARY_DAYS_PER_STOP = 1.0
+ITINERARY_KM_PER_DAY = float(os.getenv("ITINERARY_KM_PER_DAY", 300))
+ITINERARY_MATRIX_CACHE_SIZE = int(os.getenv("ITINERARY_MATRIX_CACHE_SIZE", 64))
+
+# Pairwise distances between every place of a state, computed the first
+# time the state is planned for and dropped with the snapshot.
+distance_matrix_cache = TTLCache(ttl=float('inf'), maxsize=ITINERARY_MATRIX_CACHE_SIZE)
+register_cache_metrics('distance_matrices', distance_matrix_cache)
+dataset_manager.add_listener(lambda snap: distance_matrix_cache.clear())
+
+
+def state_distance_matrix(snap, state):
+    """Return (row positions, km distance matrix) for a state's places with coordinates."""
+    key = snap.city_states_index.resolve(state, partial=False)
+    return distance_matrix_cache.get((snap.version, tuple(key)), lambda k: _distance_matrix(snap, state))
+
+
+def _distance_matrix(snap, state):
+    positions = np.asarray(snap.city_states_index.positions(state, partial=False), dtype=np.int64)
+    lat = np.radians(snap.cities_df['latitude'].to_numpy(dtype=float)[positions])
+    lon = np.radians(snap.cities_df['longitude'].to_numpy(dtype=float)[positions])
+    valid = np.isfinite(lat) & np.isfinite(lon)
+    positions, lat, lon = positions[valid], lat[valid], lon[valid]
+    matrix = haversine_km(lat[:, None], lon[:, None], lat[None, :], lon[None, :])
+    positions.flags.writeable = False
+    matrix.flags.writeable = False
+    return positions, matrix
+
+
+def two_opt(dist, route, max_passes=1000):
+    """Shorten ``route`` by reversing segments; its first and last nodes stay put.
+
+    Each pass evaluates every reversal at once and applies the best one,
+    until no reversal makes the route shorter.
+    """
+    route = np.array(route)
+    for _ in range(max_passes):
+        m = len(route) - 2
+        if m < 2:
+            break
+        inner = np.arange(1, m + 1)
+        before, first = route[inner - 1], route[inner]
+        last, after = route[inner], route[inner + 1]
+        # delta[i, j]: change in length from reversing route[i+1 .. j+1]
+        delta = (dist[before[:, None], last[None, :]] + dist[first[:, None], after[None, :]]
+                 - dist[before, first][:, None] - dist[last, after][None, :])
+        delta[np.tril_indices(m)] = 0
+        i, j = np.unravel_index(np.argmin(delta), delta.shape)
+        if delta[i, j] >= -1e-9:
+            break
+        route[i + 1:j + 2] = route[i + 1:j + 2][::-1].copy()
+    return route
+
+
+def route_length(dist, route):
+    return float(dist[route[:-1], route[1:]].sum())
+
+
+def plan_route(dist, value, days, stay=ITINERARY_DAYS_PER_STOP, km_per_day=ITINERARY_KM_PER_DAY):
+    """Pick and order stops worth the most ``value`` within ``days``.
+
+    ``dist`` covers node 0 (start), nodes 1..n (candidates, worth
+    ``value[i - 1]``) and node n + 1 (where the trip ends: a copy of the
+    start for a round trip, or a node at distance 0 from everything). A
+    route uses ``stay`` days per stop plus its length / ``km_per_day``.
+
+    Nearest-neighbour construction favours the stop with the best value
+    per day spent reaching and visiting it. Then, until nothing changes:
+    2-opt shortens the route, the time saved is filled by cheapest
+    insertion of the remaining candidates, and a stop is swapped for a
+    more valuable unvisited one where that still fits. Returns the node
+    route including both ends.
+    """
+    n = len(value)
+    end = n + 1
+    budget = days + 1e-9
+    gain = np.concatenate(([0.0], value, [0.0]))
+    unvisited = np.ones(n + 2, dtype=bool)
+    unvisited[[0, end]] = False
+
+    def fits(stops, length):
+        return stops * stay + length / km_per_day <= budget
+
+    route = [0, end]
+    length = dist[0, end]
+    while True:
+        current = route[-2]
+        extra = dist[current] + dist[:, end] - dist[current, end]
+        feasible = unvisited & fits(len(route) - 1, length + extra)
+        if not feasible.any():
+            break
+        score = np.where(feasible, gain / (stay + dist[current] / km_per_day), -np.inf)
+        nxt = int(np.argmax(score))
+        route.insert(-1, nxt)
+        length += extra[nxt]
+        unvisited[nxt] = False
+
+    while True:
+        route = two_opt(dist, route)
+        changed = False
+
+        # Cheapest insertion, most valuable candidates first
+        length = route_length(dist, route)
+        for node in np.flatnonzero(unvisited)[np.argsort(-gain[unvisited], kind='stable')]:
+            extra = dist[route[:-1], node] + dist[node, route[1:]] - dist[route[:-1], route[1:]]
+            at = int(np.argmin(extra))
+            if fits(len(route) - 1, length + extra[at]):
+                route = np.insert(route, at + 1, node)
+                length += extra[at]
+                unvisited[node] = False
+                changed = True
+        if changed:
+            continue
+
+        # Replace the least valuable stop that can be upgraded
+        for i in 1 + np.argsort(gain[route[1:-1]], kind='stable'):
+            better = np.flatnonzero(unvisited & (gain > gain[route[i]]))
+            if not len(better):
+                continue
+            rest = np.delete(route, i)
+            extra = (dist[rest[:-1][:, None], better[None, :]] + dist[better[None, :], rest[1:][:, None]]
+                     - dist[rest[:-1], rest[1:]][:, None])
+            at = np.argmin(extra, axis=0)
+            ok = fits(len(rest) - 1, route_length(dist, rest) + extra[at, np.arange(len(better))])
+            if ok.any():
+                pick = int(np.argmax(np.where(ok, gain[better], -np.inf)))
+                node = better[pick]
+                unvisited[route[i]] = True
+                unvisited[node] = False
+                route = np.insert(rest, at[pick] + 1, node)
+                changed = True
+                break
+        if not changed:
+            return route
+
+
+ITINERARY_COLUMNS = ['state_name', 'city_name', 'category', 'tourist_rating', 'risk_index',
+                     'best_time_to_visit', 'latitude', 'longitude']
 
-    except Exception as e:
-        print(f"[ERROR] in recommend: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return jsonify({'error': str(e), 'recommendations': []}), 500
+
+@app.route('/itinerary', methods=['POST'])
+def itinerary():
+    """Plan a multi-stop trip within a state.
+
+    Body: ``start`` ({"lat", "lon"} or {"state", "city"}), ``days``
+    (1-30), optional ``interests`` (categories), ``max_risk`` (0-1, compared
+    with risk_index; default 1.0), ``month``, ``state`` (defaults to the
+    start's state, or that of the place nearest to a lat/lon start) and
+    ``round_trip``. Stops are worth ``tourist_rating * (1 - risk_index)``;
+    travel time comes out of the same day budget as the visits.
+    """
+    snap = dataset_manager.snapshot
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "JSON body required"}), 400
+    start = data.get('start') or {}
+    if not isinstance(start, dict):
+        return jsonify({"error": "'start' must be an object"}), 400
+    try:
+        days = _float_arg(data, 'days', None, 1, ITINERARY_MAX_DAYS)
+        max_risk = _float_arg(data, 'max_risk', 1.0, 0, 1)
+        lat = _float_arg(start, 'lat', None, -90, 90)
+        lon = _float_arg(start, 'lon', None, -180, 180)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if days is None:
+        return jsonify({"error": "'days' is required"}), 400
+    interests = data.get('interests') or None
+    if interests is not None and not isinstance(interests, list):
+        return jsonify({"error": "'interests' must be a list"}), 400
+
+    start_pos = None
+    if start.get('state') and start.get('city'):
+        found = snap.city_index.get((normalize_name(start['state']), normalize_name(start['city'])))
+        if not found:
+            return jsonify({"error": "Start city not found"}), 404
+        start_pos = found[0]
+        lat = float(snap.cities_df['latitude'].iloc[start_pos])
+        lon = float(snap.cities_df['longitude'].iloc[start_pos])
+        if not (np.isfinite(lat) and np.isfinite(lon)):
+            return jsonify({"error": "Start city has no coordinates"}), 404
+    elif lat is None or lon is None:
+        return jsonify({"error": "'start' needs lat and lon, or state and city"}), 400
+
+    state = data.get('state')
+    if not state:
+        if start_pos is None:
+            nearest, _ = snap.geo_index.nearest(lat, lon, k=1)
+            if not len(nearest):
+                return jsonify({"error": "No places with coordinates"}), 404
+            start_state_pos = nearest[0]
+        else:
+            start_state_pos = start_pos
+        state = snap.cities_df['state_name'].iloc[start_state_pos]
+
+    with FILTER_LATENCY.time('itinerary'):
+        positions, matrix = state_distance_matrix(snap, state)
+        if not len(positions):
+            return jsonify({"error": f"No places found for state '{state}'"}), 404
+
+        index = snap.place_index
+        ok = index.match(positions, categories=interests, month=data.get('month'),
+                         popular_only=True, min_rating=0, max_risk=max_risk)
+        if start_pos is not None:
+            ok &= positions != start_pos
+        value = index.rating[positions] * (1 - index.risk[positions])
+        candidates = np.flatnonzero(ok & (value > 0))
+        # Highest value first; ties keep table order
+        candidates = candidates[np.argsort(-value[candidates], kind='stable')][:ITINERARY_MAX_CANDIDATES]
+
+        round_trip = bool(data.get('round_trip', False))
+        n = len(candidates)
+        stop_positions = positions[candidates]
+        from_start = haversine_km(
+            np.radians(lat), np.radians(lon),
+            np.radians(snap.cities_df['latitude'].to_numpy(dtype=float)[stop_positions]),
+            np.radians(snap.cities_df['longitude'].to_numpy(dtype=float)[stop_positions]))
+        dist = np.zeros((n + 2, n + 2))
+        dist[1:n + 1, 1:n + 1] = matrix[np.ix_(candidates, candidates)]
+        dist[0, 1:n + 1] = dist[1:n + 1, 0] = from_start
+        if round_trip:
+            dist[n + 1, 1:n + 1] = dist[1:n + 1, n + 1] = from_start
+        route = plan_route(dist, value[candidates], days)
+
+    stops = stop_positions[np.asarray(route[1:-1], dtype=np.int64) - 1]
+    records = dataframe_to_records(snap.cities_df.iloc[stops], columns=ITINERARY_COLUMNS,
+                                   float_columns=RECOMMENDATION_FLOAT_COLUMNS, fill='')
+    elapsed = 0.0
+    for record, (a, b) in zip(records, zip(route[:-2], route[1:-1])):
+        leg = float(dist[a, b])
+        elapsed += leg / ITINERARY_KM_PER_DAY
+        record['leg_km'] = round(leg, 1)
+        record['day'] = int(elapsed) + 1
+        elapsed += ITINERARY_DAYS_PER_STOP
+    total_km = route_length(dist, route)
+    return jsonify({
+        "start": {"lat": lat, "lon": lon},
+        "state": state,
+        "days": days,
+        "days_used": round(len(records) * ITINERARY_DAYS_PER_STOP + total_km / ITINERARY_KM_PER_DAY, 2),
+        "total_km": round(total_km, 1),
+        "round_trip": round_trip,
+        "candidates": n,
+        "stops": records
+    })
 
 
 @app.route('/debug/categories', methods=['GET'])
 def debug_categories():
-    categories = cities_df['category'].dropna().unique().tolist()
+    snap = dataset_manager.snapshot
+    categories = snap.cities_df['category'].dropna().unique().tolist()
     return jsonify({
         "total_categories": len(categories),
         "categories": sorted(categories)
     })
-# Compare two cities based on risk and rating
-@app.route('/compare/cities', methods=['GET'])
+# Compare cities based on risk and rating
+@app.route('/compare/cities', methods=['GET', 'POST'])
 def compare_cities():
-    state1 = request.args.get('state1')
-    city1 = request.args.get('city1')
-    state2 = request.args.get('state2')
-    city2 = request.args.get('city2')
-    if not all([state1, city1, state2, city2]):
+    """Compare any number of cities.
+
+    Pass ``state1``/``city1``, ``state2``/``city2``, ... as query params (or
+    in a JSON body), or a JSON body ``{"cities": [{"state": ..., "city": ...}]}``.
+    """
+    snap = dataset_manager.snapshot
+    data = request.get_json(silent=True) if request.method == 'POST' else None
+    if isinstance(data, dict) and isinstance(data.get('cities'), list):
+        pairs = [(str(c.get('state', '')), str(c.get('city', '')))
+                 for c in data['cities'] if isinstance(c, dict)]
+    else:
+        pairs = numbered_params(data if isinstance(data, dict) else request.args, 'state', 'city')
+    if len(pairs) < 2:
         return jsonify({"error": "Please provide state1, city1, state2, city2 query params."}), 400
+    if len(pairs) > COMPARE_MAX_ITEMS:
+        return jsonify({"error": f"At most {COMPARE_MAX_ITEMS} cities can be compared"}), 400
 
-    c1 = cities_df[(cities_df['state_name'].str.lower() == state1.lower()) &
-                   (cities_df['city_name'].str.lower() == city1.lower())]
-    c2 = cities_df[(cities_df['state_name'].str.lower() == state2.lower()) &
-                   (cities_df['city_name'].str.lower() == city2.lower())]
-    if c1.empty or c2.empty:
-        return jsonify({"error": "One or both cities not found."}), 404
-
-    keys = ['tourist_rating', 'risk_index', 'category', 'best_time_to_visit']
-    comparison = {
-        key: {
-            f"{city1}, {state1}": c1.iloc[0][key].item() if hasattr(c1.iloc[0][key], 'item') else c1.iloc[0][key],
-            f"{city2}, {state2}": c2.iloc[0][key].item() if hasattr(c2.iloc[0][key], 'item') else c2.iloc[0][key]
-        } for key in keys
-    }
+    positions, not_found = [], []
+    for state, city in pairs:
+        found = snap.city_index.get((normalize_name(state), normalize_name(city)))
+        if found:
+            positions.append(found[0])
+        else:
+            not_found.append(f"{city}, {state}")
+    if not_found:
+        return jsonify({"error": "One or more cities not found.", "not_found": not_found}), 404
+
+    labels = [f"{city}, {state}" for state, city in pairs]
+    return jsonify(snap.city_comparison.compare(labels, positions))
+
+USER_FIELDS = ['_id', 'username', 'email', 'interests', 'createdAt']
+USERS_PAGE_SIZE = 100
 
-    return jsonify(comparison)
+
+def encode_user_cursor(last_id):
+    return _encode_token('u', last_id)
+
+
+def decode_user_cursor(cursor):
+    try:
+        return ObjectId(_decode_token(cursor, 'u'))
+    except InvalidId:
+        raise ValueError("Invalid 'cursor'")
 
 
 # List all users (safe view)
 @app.route('/users', methods=['GET'])
 def list_users():
-    """Return list of users stored in MongoDB, omitting password fields.
+    """Return a page of users stored in MongoDB, omitting password fields.
+
+    Pages are ordered by ``_id`` and read with a range query on it, so every
+    page costs the same however deep it is. ``limit`` (default 100) sets the
+    page size and ``fields`` projects the returned keys; the body stays a
+    list and the ``X-Next-Cursor`` header holds the cursor for the next page.
 
     Note: This endpoint exposes user records and should be protected in
     production (authentication/authorization). For now it is handy for
     development and debugging.
     """
+    if not mongo_ready():
+        return jsonify({"error": "User service is currently unavailable"}), 503
+
+    try:
+        limit, after, fields = parse_page_params(
+            request.args, USER_FIELDS, decode=decode_user_cursor, start=None)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    limit = limit or USERS_PAGE_SIZE
+
     try:
         users = []
-        # Exclude password field from the returned documents
-        cursor = users_collection.find({}, {"password": 0})
+        # Exclude password field from the returned documents (_id is always
+        # read, it is the page key)
+        projection = {f: 1 for f in fields} if fields else {"password": 0}
+        query = {"_id": {"$gt": after}} if after is not None else {}
+        # One extra document tells whether there is a next page
+        cursor = users_collection.find(query, projection).sort("_id", ASCENDING).limit(limit + 1)
         for doc in cursor:
+            users.append(doc)
+        next_cursor = encode_user_cursor(users[limit - 1]['_id']) if len(users) > limit else None
+        users = users[:limit]
+        for doc in users:
             # Convert ObjectId to string for JSON serialization
-            if '_id' in doc:
+            if fields and '_id' not in fields:
+                del doc['_id']
+            elif '_id' in doc:
                 doc['_id'] = str(doc['_id'])
-            users.append(doc)
-        return jsonify(users)
+        response = jsonify(users)
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response
     except Exception as e:
         app.logger.exception('Failed to fetch users')
         return jsonify({"error": "Failed to fetch users", "details": str(e)}), 500
@@ -583,6 +2610,86 @@ def _ensure_api_key():
         )
     return True, key
 
+
+# ---------------------------------------------
+# 🔹 WEATHER RESPONSE CACHE (TTL + LRU, stale-while-revalidate)
+# ---------------------------------------------
+from concurrent.futures import ThreadPoolExecutor
+
+# Weather changes on a ~10 minute scale, so serve cached provider responses
+# for that long and keep serving them (while refreshing in the background)
+# for a while after they expire.
+WEATHER_CACHE_TTL = float(os.getenv("WEATHER_CACHE_TTL", 600))
+WEATHER_CACHE_STALE_TTL = float(os.getenv("WEATHER_CACHE_STALE_TTL", 1800))
+WEATHER_CACHE_SIZE = int(os.getenv("WEATHER_CACHE_SIZE", 512))
+
+
+# Bounded fan-out for /weather/batch; the provider session keeps one
+# keep-alive connection per worker so batch calls reuse TCP connections.
+WEATHER_BATCH_CONCURRENCY = int(os.getenv("WEATHER_BATCH_CONCURRENCY", 8))
+WEATHER_BATCH_MAX_ITEMS = int(os.getenv("WEATHER_BATCH_MAX_ITEMS", 100))
+
+from requests.adapters import HTTPAdapter
+
+weather_session = requests.Session()
+weather_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=max(WEATHER_BATCH_CONCURRENCY, 10)))
+weather_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=max(WEATHER_BATCH_CONCURRENCY, 10)))
+weather_executor = ThreadPoolExecutor(max_workers=WEATHER_BATCH_CONCURRENCY, thread_name_prefix="weather")
+
+
+# Current-weather endpoint; override to go through a proxy or a local stub
+# (see benchmarks/api_suite).
+OPENWEATHER_URL = os.getenv("OPENWEATHER_URL", "http://api.openweathermap.org/data/2.5/weather")
+
+
+def weather_url(api_city_name, api_key):
+    return f"{OPENWEATHER_URL}?q={api_city_name},IN&appid={api_key}&units=metric"
+
+
+def _request_weather(api_city_name, api_key):
+    """Call OpenWeatherMap for one city and return (status_code, data).
+
+    ``data`` is None when the provider did not return JSON.
+    """
+    url = weather_url(api_city_name, api_key)
+
+    try_count = 0
+    res = None
+    while try_count < 2:
+        started = time.perf_counter()
+        try:
+            res = weather_session.get(url, timeout=10)
+            WEATHER_LATENCY.observe(time.perf_counter() - started, res.status_code)
+            break
+        except requests.exceptions.RequestException as e:
+            WEATHER_LATENCY.observe(time.perf_counter() - started, 'error')
+            app.logger.debug('Weather request attempt %s failed: %s', try_count + 1, e)
+            try_count += 1
+            if try_count >= 2:
+                raise
+            WEATHER_RETRIES.inc()
+
+    try:
+        return res.status_code, res.json()
+    except Exception:
+        return res.status_code, None
+
+
+# Keyed on the resolved OpenWeatherMap city name, so aliases such as
+# "Chennai" and the state-level lookup for Tamil Nadu share one entry.
+weather_cache = TTLCache(
+    ttl=WEATHER_CACHE_TTL,
+    maxsize=WEATHER_CACHE_SIZE,
+    stale_ttl=WEATHER_CACHE_STALE_TTL,
+    should_cache=lambda result: result[0] == 200 and result[1] is not None and "main" in result[1],
+)
+register_cache_metrics('weather', weather_cache)
+
+
+def get_weather_data(api_city_name, api_key):
+    """Return (status_code, data) for a city, served from the cache when possible."""
+    return weather_cache.get(api_city_name, lambda name: _request_weather(name, api_key))
+
 # Mapping local/alternative city names to OpenWeatherMap recognized names
 # City name mapping for OpenWeatherMap API
 city_map = {
@@ -882,349 +2989,438 @@ state_city_map = {
 }
 
 # ---------------------------------------------
-# 🔹 WEATHER FOR A CITY
-# ---------------------------------------------
-# ---------------------------------------------
-# 🔹 WEATHER FOR A CITY
+# 🔹 WEATHER PAYLOAD HELPERS
 # ---------------------------------------------
-@app.route('/weather/city/<city_name>', methods=['GET'])
-def get_city_weather(city_name):
+def resolve_city_weather_name(city_name):
+    """Return the OpenWeatherMap name for a city shown in the UI."""
     # Clean up city name - remove parentheses and extra content
     clean_city = city_name.split('(')[0].strip()  # "Coorg (Kodagu)" -> "Coorg"
-    
     # Map to API-compatible name
-    api_city_name = city_map.get(clean_city, clean_city)
-    
-    try:
-        ok, key_or_msg = _ensure_api_key()
-        if not ok:
-            return jsonify({"error": "Missing API key", "message": key_or_msg}), 500
+    return city_map.get(clean_city, clean_city)
 
-        url = (
-            f"http://api.openweathermap.org/data/2.5/weather?q={api_city_name},IN"
-            f"&appid={key_or_msg}&units=metric"
-        )
-        
-        try_count = 0
-        res = None
-        while try_count < 2:
-            try:
-                res = requests.get(url, timeout=10)
-                break
-            except requests.exceptions.RequestException as e:
-                app.logger.debug('Weather request attempt %s failed: %s', try_count + 1, e)
-                try_count += 1
-                if try_count >= 2:
-                    raise
-        
-        data = {}
-        try:
-            data = res.json()
-        except Exception:
-            return jsonify({"error": "Unexpected response from weather provider", "status_code": res.status_code}), 502
 
-        if res.status_code == 401:
-            provider_msg = data.get('message', 'Unauthorized')
-            return jsonify({
-                "error": "Invalid or unauthorized API key for OpenWeatherMap.",
-                "provider_message": provider_msg,
-                "help": "Verify your WEATHER_API_KEY / OPENWEATHER_API_KEY environment variable."
-            }), 401
+def resolve_state_weather_name(state_name):
+    """Return (state_title, OpenWeatherMap name) for a state's representative city.
+
+    The name is None when the state has no representative city.
+    """
+    state_title = state_name.title()
+    if state_title not in state_city_map:
+        return state_title, None
+    return state_title, city_map.get(state_city_map[state_title], state_city_map[state_title])
+
+
+def _weather_error(status_code, data, **not_found_extra):
+    """Return an (error_payload, http_status) pair, or None if ``data`` is usable."""
+    if data is None:
+        return {"error": "Unexpected response from weather provider", "status_code": status_code}, 502
+
+    if status_code == 401:
+        provider_msg = data.get('message', 'Unauthorized')
+        return {
+            "error": "Invalid or unauthorized API key for OpenWeatherMap.",
+            "provider_message": provider_msg,
+            "help": "Verify your WEATHER_API_KEY / OPENWEATHER_API_KEY environment variable."
+        }, 401
+
+    if status_code != 200 or "main" not in data:
+        app.logger.debug('OpenWeatherMap failed: status=%s body=%s', status_code, data)
+        payload = {"error": "Weather data not found", "details": data}
+        payload.update(not_found_extra)
+        return payload, 404
+
+    return None
+
+
+def _format_weather(data):
+    return {
+        "temperature": round(data["main"]["temp"], 1),
+        "feels_like": round(data["main"]["feels_like"], 1),
+        "humidity": data["main"]["humidity"],
+        "pressure": data["main"].get("pressure", 0),
+        "condition": data["weather"][0]["description"].title(),
+        "wind_speed": data["wind"]["speed"],
+        "visibility": data.get("visibility", 0) / 1000 if data.get("visibility") else 0,  # Convert to km
+        "clouds": data.get("clouds", {}).get("all", 0)
+    }
+
+
+def city_weather_from_result(api_city_name, status_code, data):
+    """Build the city payload from a provider (status_code, data) result."""
+    error = _weather_error(status_code, data, searched_city=api_city_name)
+    if error:
+        return error
+
+    weather = {"city": data["name"]}
+    weather.update(_format_weather(data))
+    return weather, 200
 
-        if res.status_code != 200 or "main" not in data:
-            app.logger.debug('OpenWeatherMap failed: status=%s body=%s', res.status_code, data)
-            return jsonify({
-                "error": "Weather data not found",
-                "details": data,
-                "searched_city": api_city_name
-            }), 404
-
-        weather = {
-            "city": data["name"],
-            "temperature": round(data["main"]["temp"], 1),
-            "feels_like": round(data["main"]["feels_like"], 1),
-            "humidity": data["main"]["humidity"],
-            "pressure": data["main"].get("pressure", 0),
-            "condition": data["weather"][0]["description"].title(),
-            "wind_speed": data["wind"]["speed"],
-            "visibility": data.get("visibility", 0) / 1000 if data.get("visibility") else 0,
-            "clouds": data.get("clouds", {}).get("all", 0)
-        }
-        return jsonify(weather)
 
+def state_weather_from_result(state_title, city_api_name, status_code, data):
+    """Build the state payload from a provider (status_code, data) result."""
+    error = _weather_error(status_code, data)
+    if error:
+        return error
+
+    weather = {
+        "state": state_title,
+        "representative_city": city_api_name,
+    }
+    weather.update(_format_weather(data))
+    return weather, 200
+
+
+def city_weather_payload(city_name, api_key):
+    """Return (payload, http_status) for ``/weather/city/<city_name>``."""
+    api_city_name = resolve_city_weather_name(city_name)
+    try:
+        return city_weather_from_result(api_city_name, *get_weather_data(api_city_name, api_key))
+    except Exception as e:
+        return {"error": str(e), "searched_city": api_city_name}, 500
+
+
+def state_weather_payload(state_name, api_key):
+    """Return (payload, http_status) for ``/weather/state/<state_name>``."""
+    state_title, city_api_name = resolve_state_weather_name(state_name)
+    if city_api_name is None:
+        return {"error": "State not found or no representative city available"}, 404
+
+    try:
+        return state_weather_from_result(state_title, city_api_name, *get_weather_data(city_api_name, api_key))
     except Exception as e:
-        return jsonify({"error": str(e), "searched_city": api_city_name}), 500
+        return {"error": str(e)}, 500
+
+
+def parse_weather_batch(data):
+    """Validate a /weather/batch body; returns de-duplicated (cities, states).
+
+    Raises ValueError with a client-facing message on bad input.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Missing JSON body with 'cities' and/or 'states' lists")
+
+    cities = data.get('cities') or []
+    states = data.get('states') or []
+    if not isinstance(cities, list) or not isinstance(states, list) or \
+            not all(isinstance(x, str) for x in cities + states):
+        raise ValueError("'cities' and 'states' must be lists of names")
+    if not cities and not states:
+        raise ValueError("Provide at least one city or state")
+    if len(cities) + len(states) > WEATHER_BATCH_MAX_ITEMS:
+        raise ValueError(f"At most {WEATHER_BATCH_MAX_ITEMS} cities and states per request")
+    return list(dict.fromkeys(cities)), list(dict.fromkeys(states))
+
+
+# ---------------------------------------------
+# 🔹 WEATHER FOR A CITY
+# ---------------------------------------------
+@app.route('/weather/city/<city_name>', methods=['GET'])
+def get_city_weather(city_name):
+    ok, key_or_msg = _ensure_api_key()
+    if not ok:
+        return jsonify({"error": "Missing API key", "message": key_or_msg}), 500
+
+    payload, status = city_weather_payload(city_name, key_or_msg)
+    return jsonify(payload), status
 
 # ---------------------------------------------
 # 🔹 WEATHER FOR A STATE (based on representative city)
 # ---------------------------------------------
 @app.route('/weather/state/<state_name>', methods=['GET'])
 def get_state_weather(state_name):
-    state_title = state_name.title()
-    if state_title not in state_city_map:
+    if resolve_state_weather_name(state_name)[1] is None:
         return jsonify({"error": "State not found or no representative city available"}), 404
 
-    city_api_name = city_map.get(state_city_map[state_title], state_city_map[state_title])
-    try:
-        ok, key_or_msg = _ensure_api_key()
-        if not ok:
-            return jsonify({"error": "Missing API key", "message": key_or_msg}), 500
+    ok, key_or_msg = _ensure_api_key()
+    if not ok:
+        return jsonify({"error": "Missing API key", "message": key_or_msg}), 500
 
-        url = (
-            f"http://api.openweathermap.org/data/2.5/weather?q={city_api_name},IN"
-            f"&appid={key_or_msg}&units=metric"
-        )
-        
-        try_count = 0
-        res = None
-        while try_count < 2:
-            try:
-                res = requests.get(url, timeout=10)
-                break
-            except requests.exceptions.RequestException as e:
-                app.logger.debug('Weather request attempt %s failed: %s', try_count + 1, e)
-                try_count += 1
-                if try_count >= 2:
-                    raise
-        
-        data = {}
-        try:
-            data = res.json()
-        except Exception:
-            return jsonify({"error": "Unexpected response from weather provider", "status_code": res.status_code}), 502
+    payload, status = state_weather_payload(state_name, key_or_msg)
+    return jsonify(payload), status
 
-        if res.status_code == 401:
-            provider_msg = data.get('message', 'Unauthorized')
-            return jsonify({
-                "error": "Invalid or unauthorized API key for OpenWeatherMap.",
-                "provider_message": provider_msg,
-                "help": "Verify your WEATHER_API_KEY / OPENWEATHER_API_KEY environment variable."
-            }), 401
+# ---------------------------------------------
+# 🔹 WEATHER FOR MANY CITIES / STATES IN ONE CALL
+# ---------------------------------------------
+@app.route('/weather/batch', methods=['POST'])
+def weather_batch():
+    """Return weather for several cities and/or states in one response.
+
+    Body: ``{"cities": ["Kochi", ...], "states": ["Kerala", ...]}``. Cached
+    entries are served directly; the rest are fetched concurrently over the
+    pooled provider session, at most WEATHER_BATCH_CONCURRENCY at a time.
+    Each entry carries its own payload (or error) and ``status_code``.
+    """
+    try:
+        cities, states = parse_weather_batch(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    ok, key_or_msg = _ensure_api_key()
+    if not ok:
+        return jsonify({"error": "Missing API key", "message": key_or_msg}), 500
+
+    # Concurrent lookups of the same provider name are coalesced by the cache.
+    city_futures = {c: weather_executor.submit(city_weather_payload, c, key_or_msg) for c in cities}
+    state_futures = {s: weather_executor.submit(state_weather_payload, s, key_or_msg) for s in states}
+
+    def collect(futures):
+        results = {}
+        for name, future in futures.items():
+            payload, status = future.result()
+            payload = dict(payload)
+            payload["status_code"] = status
+            results[name] = payload
+        return results
 
-        if res.status_code != 200 or "main" not in data:
-            app.logger.debug('OpenWeatherMap failed: status=%s body=%s', res.status_code, data)
-            return jsonify({
-                "error": "Weather data not found",
-                "details": data
-            }), 404
-
-        weather = {
-            "state": state_title,
-            "representative_city": city_api_name,
-            "temperature": round(data["main"]["temp"], 1),
-            "feels_like": round(data["main"]["feels_like"], 1),
-            "humidity": data["main"]["humidity"],
-            "pressure": data["main"].get("pressure", 0),  # Added pressure
-            "condition": data["weather"][0]["description"].title(),
-            "wind_speed": data["wind"]["speed"],
-            "visibility": data.get("visibility", 0) / 1000 if data.get("visibility") else 0,  # Convert to km
-            "clouds": data.get("clouds", {}).get("all", 0)
-        }
-        return jsonify(weather)
+    return jsonify({
+        "cities": collect(city_futures),
+        "states": collect(state_futures),
+        "count": len(city_futures) + len(state_futures)
+    })
 
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+
+@app.route('/weather/cache/stats', methods=['GET'])
+def weather_cache_stats():
+    return jsonify(weather_cache.stats())
 
 
 @app.route('/compare/states', methods=['POST','GET'])
 def compare_states():
-    data = request.json
-    state1 = data.get('state1')
-    state2 = data.get('state2')
-    if not state1 or not state2:
+    """Compare any number of states.
+
+    Accepts ``state1``, ``state2``, ... or a ``states`` list, in a JSON body
+    or (``state1``, ``state2``, ... only) as query params.
+    """
+    snap = dataset_manager.snapshot
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        data = request.args
+    states = data.get('states') if isinstance(data, dict) else None
+    if isinstance(states, list):
+        states = [str(s) for s in states if s]
+    else:
+        states = [s for (s,) in numbered_params(data, 'state')]
+    if len(states) < 2:
         return jsonify({"error": "state1 and state2 are required"}), 400
+    if len(states) > COMPARE_MAX_ITEMS:
+        return jsonify({"error": f"At most {COMPARE_MAX_ITEMS} states can be compared"}), 400
 
-    def safe_split(s):
-        if not s:
-            return []
-        return [x.strip().strip("'\"") for x in s.strip("[] ").split(',') if x.strip()]
+    positions, not_found = [], []
+    for state in states:
+        pos = snap.states_index.first(state, partial=False)
+        if pos is None:
+            not_found.append(state)
+        else:
+            positions.append(pos)
+    if not_found:
+        return jsonify({"error": "One or more states not found", "not_found": not_found}), 404
 
-    try:
-        # Filter states
-        df1 = states_complete_df[states_complete_df['state_name'].str.lower() == state1.lower()]
-        df2 = states_complete_df[states_complete_df['state_name'].str.lower() == state2.lower()]
-
-        if df1.empty or df2.empty:
-            return jsonify({"error": "One or both states not found"}), 404
-
-        # Identify top city based on highest tourist_rating from cities_df
-        def get_top_city(state):
-            cities = cities_df[cities_df['state_name'].str.lower() == state.lower()]
-            if cities.empty:
-                return ''
-            # Fill NaNs to 0 for rating and select city with max rating
-            cities['tourist_rating'] = cities['tourist_rating'].fillna(0)
-            top_city_row = cities.loc[cities['tourist_rating'].idxmax()]
-            return top_city_row['city_name']
-
-        top_city1 = get_top_city(state1)
-        top_city2 = get_top_city(state2)
-
-        # Extract visitors counts for each year
-        visitors_yrs = [2020, 2021, 2022, 2023, 2024, 2025]
-        visitors_data = {}
-        for year in visitors_yrs:
-            visitors_data[year] = {
-                state1: int(df1.iloc[0].get(f'visitors_{year}', 0)),
-                state2: int(df2.iloc[0].get(f'visitors_{year}', 0))
-            }
+    return jsonify(snap.state_comparison.compare(states, positions))
 
-        comp_data = {
-            'visitors_2020': visitors_data[2020],
-            'visitors_2021': visitors_data[2021],
-            'visitors_2022': visitors_data[2022],
-            'visitors_2023': visitors_data[2023],
-            'visitors_2024': visitors_data[2024],
-            'visitors_2025': visitors_data[2025],
-            'famous_for': {
-                state1: safe_split(df1.iloc[0].get('famous_for')),
-                state2: safe_split(df2.iloc[0].get('famous_for')),
-            },
-            'top_category': {
-                state1: safe_split(df1.iloc[0].get('famous_for'))[0] if df1.iloc[0].get('famous_for') else 'General',
-                state2: safe_split(df2.iloc[0].get('famous_for'))[0] if df2.iloc[0].get('famous_for') else 'General',
-            },
-            'top_city': {
-                state1: top_city1,
-                state2: top_city2,
-            },
-            'best_season': {
-                state1: safe_split(df1.iloc[0].get('best_season'))[0] if df1.iloc[0].get('best_season') else 'Year-round',
-                state2: safe_split(df2.iloc[0].get('best_season'))[0] if df2.iloc[0].get('best_season') else 'Year-round',
-            },
-            'population': {
-                state1: int(df1.iloc[0].get('population', 0)),
-                state2: int(df2.iloc[0].get('population', 0)),
-            },
-            'literacy_rate': {
-                state1: float(df1.iloc[0].get('literacy_rate', 0)),
-                state2: float(df2.iloc[0].get('literacy_rate', 0)),
-            },
-            'gdp_inr_crore': {
-                state1: float(df1.iloc[0].get('gdp_inr_crore', 0)),
-                state2: float(df2.iloc[0].get('gdp_inr_crore', 0)),
-            },
-            'area_km2': {
-                state1: float(df1.iloc[0].get('area_km2', 0)),
-                state2: float(df2.iloc[0].get('area_km2', 0)),
-            },
-            'safety_index': {
-                state1: float(df1.iloc[0].get('safety_index', 1)),
-                state2: float(df2.iloc[0].get('safety_index', 1)),
-            },
-            'capital': {
-                state1: df1.iloc[0].get('capital', ''),
-                state2: df2.iloc[0].get('capital', ''),
-            },
-            'region': {
-                state1: df1.iloc[0].get('region', ''),
-                state2: df2.iloc[0].get('region', ''),
-            }
-        }
+# ML
+FORECAST_YEARS = np.array([2026, 2027, 2028])
 
-        return jsonify(comp_data)
 
-    except Exception as e:
-        print(f"Server error: {e}")
-        return jsonify({"error": "Server error", "details": str(e)}), 500
+class TrendModel(namedtuple('TrendModel', ['slope', 'intercept'])):
+    """Ordinary least-squares visitor trend ``visitors = slope * year + intercept``."""
+
+    __slots__ = ()
+
+    def predict(self, years):
+        return self.slope * np.asarray(years, dtype=float) + self.intercept
+
+
+def fit_trends(years, visitors):
+    """Least-squares fit of every row of ``visitors`` against ``years`` at once.
+
+    Returns (slopes, intercepts) arrays. Missing values are ignored per row;
+    rows with fewer than two points get NaN coefficients.
+    """
+    Y = np.atleast_2d(np.asarray(visitors, dtype=float))
+    W = ~np.isnan(Y)
+    X = np.broadcast_to(np.asarray(years, dtype=float), Y.shape)
+    n = W.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        x_mean = np.where(W, X, 0.0).sum(axis=1) / n
+        y_mean = np.where(W, Y, 0.0).sum(axis=1) / n
+        dx = np.where(W, X - x_mean[:, None], 0.0)
+        dy = np.where(W, Y - y_mean[:, None], 0.0)
+        slopes = (dx * dy).sum(axis=1) / (dx * dx).sum(axis=1)
+        intercepts = y_mean - slopes * x_mean
+    slopes[n < 2] = np.nan
+    intercepts[n < 2] = np.nan
+    return slopes, intercepts
+
+
+def fit_trend(years, visitors):
+    """Closed-form least-squares fit (same result as sklearn's LinearRegression)."""
+    slopes, intercepts = fit_trends(years, visitors)
+    if np.isnan(slopes[0]):
+        return None
+    return TrendModel(float(slopes[0]), float(intercepts[0]))
+
+
+class TrendModelRegistry:
+    """Per-state visitor trend models, fitted lazily on first use and kept.
+
+    Every category in a state shares the same ``visitors_*`` series, so one
+    model per state row is enough. Each DataSnapshot owns its own registry,
+    so a reload never serves coefficients fitted on the previous data.
+    """
+
+    def __init__(self, states_df):
+        self._lock = threading.Lock()
+        self.visitor_cols = [c for c in states_df.columns if c.startswith('visitors_')]
+        self.years = np.array([int(c.split('_')[1]) for c in self.visitor_cols])
+        self._visitors = states_df[self.visitor_cols].to_numpy(dtype=float)
+        self._models = {}
+        self._all = None
+
+    def get(self, pos):
+        """Return the TrendModel for the state at row ``pos`` (None if unfittable)."""
+        try:
+            return self._models[pos]
+        except KeyError:
+            pass
+        with self._lock:
+            if self._all is not None:
+                # Reuse the batched fit instead of fitting the row again
+                slope, intercept = self._all[0][pos], self._all[1][pos]
+                model = None if np.isnan(slope) else TrendModel(float(slope), float(intercept))
+            elif len(self.years):
+                model = fit_trend(self.years, self._visitors[pos])
+            else:
+                model = None
+            self._models[pos] = model
+            return model
+
+    def fit_all(self):
+        """Return (slopes, intercepts) for every state row from one batched fit."""
+        if self._all is not None:
+            return self._all
+        with self._lock:
+            if self._all is None:
+                if len(self.years):
+                    self._all = fit_trends(self.years, self._visitors)
+                else:
+                    empty = np.full(len(self._visitors), np.nan)
+                    self._all = (empty, empty.copy())
+            return self._all
+
 
-# ML
-from sklearn.linear_model import LinearRegression
-import numpy as np
 
 @app.route('/predict_trend/<state_name>', methods=['GET','POST'])
 def predict_trend(state_name):
+    snap = dataset_manager.snapshot
     # Filter city data for the state
-    state_cities = cities_df[cities_df['state_name'].str.lower() == state_name.lower()]
+    state_cities = snap.cities_df.iloc[snap.city_states_index.positions(state_name, partial=False)]
     if state_cities.empty:
         return jsonify({"error": "State not found"}), 404
 
-    # Get unique categories in the state
-    categories = state_cities['category'].dropna().unique()
-
     # Prepare result dictionary
     category_predictions = {}
 
-    for category in categories:
-        cat_cities = state_cities[state_cities['category'] == category]
-        avg_rating = cat_cities['tourist_rating'].mean()
+    state_pos = snap.states_index.first(state_name, partial=False)
+    model = snap.trend_models.get(state_pos) if state_pos is not None else None
+    if model is not None:
+        predicted_visitors = model.predict(FORECAST_YEARS)
+        avg_ratings = state_cities.groupby('category', sort=False)['tourist_rating'].mean()
 
-        df = states_complete_df[states_complete_df['state_name'].str.lower() == state_name.lower()]
-        if df.empty:
-            continue
+        max_rating = 5.0
+        for category, avg_rating in avg_ratings.items():
+            adj_predictions = (predicted_visitors * (avg_rating / max_rating)).astype(int)
+
+            category_predictions[category] = {
+                "average_tourist_rating": round(avg_rating, 2),
+                "predicted_visitors_by_year": {
+                    str(year): int(val) for year, val in zip(FORECAST_YEARS, adj_predictions)
+                }
+            }
 
-        visitor_cols = [col for col in df.columns if col.startswith('visitors_')]
-        years_past = np.array([int(c.split('_')[1]) for c in visitor_cols]).reshape(-1, 1)
-        visitors = df[visitor_cols].values.flatten()
+    return jsonify({
+        "state": state_name,
+        "category_predictions": category_predictions
+    })
 
-        if len(visitors) < 2:
+# Forecast table for every state in one response
+@app.route('/predict_trend', methods=['GET'])
+def predict_trend_all():
+    snap = dataset_manager.snapshot
+    slopes, intercepts = snap.trend_models.fit_all()
+    # (states x years) forecast matrix from one broadcasted evaluation
+    predicted = slopes[:, None] * FORECAST_YEARS[None, :] + intercepts[:, None]
+    year_keys = [str(year) for year in FORECAST_YEARS]
+
+    state_names = snap.states_complete_df['state_name'].tolist()
+    state_predictions = {}
+    for pos, state in enumerate(state_names):
+        if pd.isna(state) or np.isnan(slopes[pos]):
             continue
+        state_predictions[state] = {
+            "predicted_visitors_by_year": dict(zip(year_keys, predicted[pos].astype(int).tolist())),
+            "category_predictions": {}
+        }
 
-        model = LinearRegression()
-        model.fit(years_past, visitors)
-
-        future_years = np.array([2026, 2027, 2028]).reshape(-1, 1)
-        predicted_visitors = model.predict(future_years)
-
-        max_rating = 5.0
-        adj_predictions = (predicted_visitors * (avg_rating / max_rating)).astype(int)
-
-        category_predictions[category] = {
+    # Per-category rating adjustment for all states from one groupby
+    avg_ratings = snap.cities_df.groupby(['state_name', 'category'], sort=False)['tourist_rating'].mean()
+    state_pos = []
+    for state in avg_ratings.index.get_level_values(0):
+        pos = snap.states_index.first(state, partial=False)
+        state_pos.append(-1 if pos is None else pos)
+    state_pos = np.array(state_pos, dtype=int)
+    known = (state_pos >= 0) & ~np.isnan(slopes[np.maximum(state_pos, 0)])
+    avg_ratings = avg_ratings[known]
+    state_pos = state_pos[known]
+
+    max_rating = 5.0
+    adj_predictions = (predicted[state_pos] * (avg_ratings.to_numpy()[:, None] / max_rating)).astype(int)
+
+    for pos, (_, category), avg_rating, row in zip(state_pos, avg_ratings.index, avg_ratings, adj_predictions):
+        state_predictions[state_names[pos]]["category_predictions"][category] = {
             "average_tourist_rating": round(avg_rating, 2),
-            "predicted_visitors_by_year": {
-                str(year[0]):int(val) for year, val in zip(future_years, adj_predictions)
-            }
+            "predicted_visitors_by_year": dict(zip(year_keys, row.tolist()))
         }
 
     return jsonify({
-        "state": state_name,
-        "category_predictions": category_predictions
+        "years": [int(year) for year in FORECAST_YEARS],
+        "count": len(state_predictions),
+        "state_predictions": state_predictions
     })
 
 # Get future predictions for a specific state and category
 @app.route('/predict_trend/<state_name>/<category>', methods=['GET'])
 def predict_trend_by_category(state_name, category):
+    snap = dataset_manager.snapshot
     # Filter city data for the state and category
-    state_cities = cities_df[
-        (cities_df['state_name'].str.lower() == state_name.lower()) &
-        (cities_df['category'].str.lower() == category.lower())
-    ]
+    state_cities = snap.cities_df.iloc[snap.city_states_index.positions(state_name, partial=False)]
+    state_cities = state_cities[state_cities['category'].str.lower() == category.lower()]
     
     if state_cities.empty:
         return jsonify({"error": "State or category not found"}), 404
 
     # Get state data
-    df = states_complete_df[states_complete_df['state_name'].str.lower() == state_name.lower()]
-    if df.empty:
+    state_pos = snap.states_index.first(state_name, partial=False)
+    if state_pos is None:
         return jsonify({"error": "State not found"}), 404
 
-    # Get visitor data
-    visitor_cols = [col for col in df.columns if col.startswith('visitors_')]
-    years_past = np.array([int(c.split('_')[1]) for c in visitor_cols]).reshape(-1, 1)
-    visitors = df[visitor_cols].values.flatten()
-
-    if len(visitors) < 2:
+    model = snap.trend_models.get(state_pos)
+    if model is None:
         return jsonify({"error": "Insufficient data for prediction"}), 400
 
-    # Create model and predict
-    model = LinearRegression()
-    model.fit(years_past, visitors)
-
     # Historical data
+    row = snap.states_complete_df.iloc[state_pos]
     historical_data = []
-    for i, col in enumerate(visitor_cols):
-        year = int(col.split('_')[1])
+    for year, col in zip(snap.trend_models.years, snap.trend_models.visitor_cols):
         historical_data.append({
-            "year": year,
-            "visitors": int(visitors[i]) if pd.notna(visitors[i]) else 0
+            "year": int(year),
+            "visitors": int(row[col]) if pd.notna(row[col]) else 0
         })
 
     # Future predictions
-    future_years = np.array([2026, 2027, 2028]).reshape(-1, 1)
-    predicted_visitors = model.predict(future_years)
+    predicted_visitors = model.predict(FORECAST_YEARS)
 
     future_data = []
-    for year, visitors in zip(future_years.flatten(), predicted_visitors):
+    for year, visitors in zip(FORECAST_YEARS, predicted_visitors):
         future_data.append({
             "year": int(year),
             "visitors": int(visitors)
@@ -1239,30 +3435,148 @@ def predict_trend_by_category(state_name, category):
     })
 
 
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
+DEFAULT_CLUSTER_FEATURES = ['population', 'gdp_inr_crore', 'safety_index', 'literacy_rate']
+DEFAULT_CLUSTER_COUNT = 4
+
+
+class ClusteringRegistry:
+    """Memoized KMeans clusterings of the states, one per (version, k, features).
+
+    Results are computed once per dataset version and never mutated, so
+    concurrent requests share them safely and ``states_complete_df`` is left
+    untouched. The snapshot version in the key keeps a request that started
+    before a reload from caching old clusters under the new version;
+    ``invalidate`` drops everything once a new snapshot is live.
+    """
+
+    def __init__(self, maxsize=64):
+        self._cache = TTLCache(ttl=float('inf'), maxsize=maxsize)
+
+    def invalidate(self, snap=None):
+        self._cache.clear()
+
+    def get(self, snap, k, features):
+        df = snap.states_complete_df
+        return self._cache.get((snap.version, k, tuple(features)),
+                               lambda key: self._cluster(df, key))
+
+    def _cluster(self, states_df, key):
+        # sklearn (and scipy under it) takes over a second to import, so it
+        # is loaded on first use or by preload_ml_modules(), not at startup.
+        from sklearn.cluster import KMeans
+        from sklearn.metrics import silhouette_score
+        from sklearn.preprocessing import StandardScaler
+
+        _, k, features = key
+        features = list(features)
+        df = states_df[features].dropna()
+        scaler = StandardScaler()
+        X = scaler.fit_transform(df)
+
+        kmeans = KMeans(n_clusters=k, random_state=42)
+        clusters = kmeans.fit_predict(X)
+
+        labels = dict(zip(df.index, clusters.tolist()))
+        summary = [
+            {"state_name": state, "cluster": labels.get(idx)}
+            for idx, state in zip(states_df.index, states_df['state_name'])
+        ]
+        centroids = scaler.inverse_transform(kmeans.cluster_centers_)
+        return {
+            "summary": summary,
+            "silhouette_score": round(float(silhouette_score(X, clusters)), 4),
+            "centroids": [
+                {"cluster": i, **{f: round(float(v), 4) for f, v in zip(features, centre)}}
+                for i, centre in enumerate(centroids)
+            ],
+            "cluster_sizes": np.bincount(clusters, minlength=k).tolist(),
+        }
+
+
+cluster_registry = ClusteringRegistry()
+register_cache_metrics('clusters', cluster_registry._cache)
+dataset_manager.add_listener(cluster_registry.invalidate)
+
 
 @app.route('/cluster_states', methods=['GET'])
 def cluster_states():
-    features = ['population', 'gdp_inr_crore', 'safety_index', 'literacy_rate']
-    df = states_complete_df[features].dropna()
-    X = StandardScaler().fit_transform(df)
+    """Cluster states with KMeans.
 
-    kmeans = KMeans(n_clusters=4, random_state=42)
-    clusters = kmeans.fit_predict(X)
+    Query params: ``k`` (default 4), ``features`` (comma-separated numeric
+    columns, default population, gdp_inr_crore, safety_index, literacy_rate)
+    and ``details=true`` to include silhouette score, centroids and sizes.
+    """
+    snap = dataset_manager.snapshot
+    try:
+        k = int(request.args.get('k', DEFAULT_CLUSTER_COUNT))
+    except ValueError:
+        return jsonify({"error": "'k' must be an integer"}), 400
+
+    features_param = request.args.get('features')
+    if features_param:
+        features = list(dict.fromkeys(f.strip() for f in features_param.split(',') if f.strip()))
+    else:
+        features = DEFAULT_CLUSTER_FEATURES
+    unknown = [f for f in features if f not in snap.numeric_state_features]
+    if not features or unknown:
+        return jsonify({
+            "error": "Unknown or non-numeric features",
+            "invalid": unknown,
+            "available": snap.numeric_state_features
+        }), 400
+
+    n_samples = len(snap.states_complete_df[features].dropna())
+    if not 2 <= k < n_samples:
+        return jsonify({"error": f"'k' must be between 2 and {n_samples - 1}"}), 400
+
+    result = cluster_registry.get(snap, k, features)
+    response = {
+        "total_clusters": k,
+        "features": features,
+        "cluster_summary": result["summary"]
+    }
+    if request.args.get('details', '').lower() in ('1', 'true', 'yes'):
+        response["silhouette_score"] = result["silhouette_score"]
+        response["centroids"] = result["centroids"]
+        response["cluster_sizes"] = result["cluster_sizes"]
+    return jsonify(response)
 
-    states_complete_df['cluster'] = clusters
-    result = states_complete_df[['state_name', 'cluster']].to_dict(orient='records')
 
-    return jsonify({
-        "total_clusters": 4,
-        "cluster_summary": result
-    })
+# Build the first snapshot now that every class it uses is defined. Under
+# gunicorn this runs once in the master (preload_app) and workers inherit it
+# copy-on-write. Only NumPy/pandas work happens here; sklearn (OpenMP) is
+# kept out of the pre-fork process.
+dataset_manager.reload()
 
 
-if __name__ == '__main__':
-    # Disable the Werkzeug auto-reloader on Windows to avoid occasional
-    # OSError: [WinError 10038] when the reloader's thread/server interact
-    # poorly with the system selector. In development you can set debug
-    # True but keep use_reloader False to avoid the issue.
-    app.run(debug=True, use_reloader=False)
+ML_MODULES = ('sklearn.cluster', 'sklearn.metrics', 'sklearn.preprocessing')
+
+
+def preload_ml_modules():
+    """Import sklearn in a background thread so the first /cluster_states
+    request does not pay for it.
+    """
+    def _import():
+        started = time.perf_counter()
+        try:
+            for name in ML_MODULES:
+                importlib.import_module(name)
+        except ImportError as e:
+            app.logger.warning("Could not preload ML modules: %s", e)
+            return
+        app.logger.debug("Preloaded ML modules in %.2fs", time.perf_counter() - started)
+
+    thread = threading.Thread(target=_import, name="ml-preload", daemon=True)
+    thread.start()
+    return thread
+
+
+def start_background_tasks():
+    """Start per-process helper threads. Call once the server (or a forked
+    worker) is up, since threads do not survive a fork.
+    """
+    preload_ml_modules()
+    threading.Thread(target=password_hasher.start, name="hasher-start", daemon=True).start()
+    if DATA_RELOAD_INTERVAL > 0:
+        dataset_manager.watch(DATA_RELOAD_INTERVAL)
+
@@ -0,0 +1,238 @@
+"""ASGI entry point with native async weather routes.
+
+Run with:
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+
+``/weather/city/<city>``, ``/weather/state/<state>`` and ``POST /weather/batch``
+are served on the event loop with a pooled ``httpx.AsyncClient``, so a slow
+OpenWeatherMap only costs pending tasks, not blocked worker threads. They
+share the in-process weather cache (and its metrics) with the Flask routes.
+Every other request, including CORS preflights, is passed to the Flask app
+through ``asgiref``'s WSGI adapter.
+"""
+import asyncio
+import json
+import time
+
+import httpx
+from asgiref.wsgi import WsgiToAsgi
+
+import app as backend
+
+flask_asgi = WsgiToAsgi(backend.app)
+
+# Upper bound on concurrent provider calls per process; extra requests wait
+# for a free slot instead of opening more connections.
+WEATHER_MAX_CONNECTIONS = max(backend.WEATHER_BATCH_CONCURRENCY, 20)
+
+
+class AsyncWeatherClient:
+    """Async counterpart of ``backend.get_weather_data``.
+
+    Uses one keep-alive connection pool per process, coalesces concurrent
+    misses for the same city into one provider call and refreshes stale
+    cache entries in background tasks.
+    """
+
+    def __init__(self, max_connections=WEATHER_MAX_CONNECTIONS):
+        self.max_connections = max_connections
+        self._client = None
+        self._inflight = {}
+        # Stale-while-revalidate refreshes nobody awaits; kept so they are
+        # not garbage-collected mid-flight and their failures get counted
+        self._refreshes = set()
+        self._slots = None
+
+    def _ensure_client(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=10,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+            )
+            self._slots = asyncio.Semaphore(self.max_connections)
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def get(self, api_city_name, api_key):
+        """Return (status_code, data) for a city, served from the cache when possible."""
+        cached = backend.weather_cache.peek(api_city_name)
+        if cached is not None:
+            value, stale = cached
+            if stale and api_city_name not in self._inflight:
+                task = self._load(api_city_name, api_key)
+                self._refreshes.add(task)
+                task.add_done_callback(lambda t: self._refresh_done(api_city_name, t))
+            return value
+        backend.weather_cache.record_miss(coalesced=api_city_name in self._inflight)
+        return await asyncio.shield(self._load(api_city_name, api_key))
+
+    def _load(self, api_city_name, api_key):
+        task = self._inflight.get(api_city_name)
+        if task is None:
+            task = asyncio.ensure_future(self._request(api_city_name, api_key))
+            self._inflight[api_city_name] = task
+            task.add_done_callback(lambda _: self._inflight.pop(api_city_name, None))
+        return task
+
+    def _refresh_done(self, api_city_name, task):
+        self._refreshes.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            backend.weather_cache.record_refresh_error(api_city_name, task.exception())
+
+    async def _request(self, api_city_name, api_key):
+        client = self._ensure_client()
+        url = backend.weather_url(api_city_name, api_key)
+
+        async with self._slots:
+            for attempt in (1, 2):
+                started = time.perf_counter()
+                try:
+                    res = await client.get(url)
+                except httpx.HTTPError as e:
+                    backend.WEATHER_LATENCY.observe(time.perf_counter() - started, 'error')
+                    backend.app.logger.debug('Weather request attempt %s failed: %s', attempt, e)
+                    if attempt == 2:
+                        raise
+                    backend.WEATHER_RETRIES.inc()
+                else:
+                    backend.WEATHER_LATENCY.observe(time.perf_counter() - started, res.status_code)
+                    break
+
+        try:
+            result = res.status_code, res.json()
+        except ValueError:
+            result = res.status_code, None
+        backend.weather_cache.set(api_city_name, result)
+        return result
+
+
+weather_client = AsyncWeatherClient()
+
+
+async def city_weather_payload(city_name, api_key):
+    api_city_name = backend.resolve_city_weather_name(city_name)
+    try:
+        return backend.city_weather_from_result(api_city_name, *await weather_client.get(api_city_name, api_key))
+    except Exception as e:
+        return {"error": str(e), "searched_city": api_city_name}, 500
+
+
+async def state_weather_payload(state_name, api_key):
+    state_title, city_api_name = backend.resolve_state_weather_name(state_name)
+    if city_api_name is None:
+        return {"error": "State not found or no representative city available"}, 404
+    try:
+        return backend.state_weather_from_result(
+            state_title, city_api_name, *await weather_client.get(city_api_name, api_key))
+    except Exception as e:
+        return {"error": str(e)}, 500
+
+
+async def weather_batch_payload(body):
+    try:
+        cities, states = backend.parse_weather_batch(body)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+    ok, key_or_msg = backend._ensure_api_key()
+    if not ok:
+        return {"error": "Missing API key", "message": key_or_msg}, 500
+
+    results = await asyncio.gather(
+        *(city_weather_payload(c, key_or_msg) for c in cities),
+        *(state_weather_payload(s, key_or_msg) for s in states),
+    )
+
+    def collect(names, pairs):
+        return {name: dict(payload, status_code=status) for name, (payload, status) in zip(names, pairs)}
+
+    return {
+        "cities": collect(cities, results[:len(cities)]),
+        "states": collect(states, results[len(cities):]),
+        "count": len(results)
+    }, 200
+
+
+async def _send_json(send, payload, status):
+    body = json.dumps(payload, sort_keys=True).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"access-control-allow-origin", b"*"),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def _route_weather(scope, receive):
+    """Return (rule, payload, status) for an async weather route, or None."""
+    method = scope["method"]
+    parts = scope["path"].rstrip("/").split("/")
+    if len(parts) != 4 and parts[1:] != ["weather", "batch"]:
+        return None
+
+    if method == "GET" and len(parts) == 4 and parts[1] == "weather" and parts[2] in ("city", "state"):
+        name = parts[3]
+        if parts[2] == "state" and backend.resolve_state_weather_name(name)[1] is None:
+            return ("/weather/state/<state_name>",
+                    {"error": "State not found or no representative city available"}, 404)
+        ok, key_or_msg = backend._ensure_api_key()
+        if parts[2] == "city":
+            rule = "/weather/city/<city_name>"
+            if not ok:
+                return rule, {"error": "Missing API key", "message": key_or_msg}, 500
+            return (rule, *await city_weather_payload(name, key_or_msg))
+        rule = "/weather/state/<state_name>"
+        if not ok:
+            return rule, {"error": "Missing API key", "message": key_or_msg}, 500
+        return (rule, *await state_weather_payload(name, key_or_msg))
+
+    if method == "POST" and parts[1:] == ["weather", "batch"]:
+        try:
+            body = json.loads(await _read_body(receive) or b"null")
+        except ValueError:
+            body = None
+        return ("/weather/batch", *await weather_batch_payload(body))
+
+    return None
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                backend.start_background_tasks()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await weather_client.aclose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    if scope["type"] == "http" and scope["path"].startswith("/weather/"):
+        started = time.perf_counter()
+        routed = await _route_weather(scope, receive)
+        if routed is not None:
+            rule, payload, status = routed
+            await _send_json(send, payload, status)
+            backend.REQUEST_LATENCY.observe(time.perf_counter() - started, rule, scope["method"], status)
+            return
+
+    await flask_asgi(scope, receive, send)
@@ -0,0 +1,22 @@
+"""Latency/throughput/memory benchmark for every API route.
+
+Usage (from Backend/):
+    python -m benchmarks.api_suite [--rows 0 10000 100000] [--requests 200]
+        [--concurrency 1] [--only recommend search_places]
+        [--output results.json] [--compare baseline.json]
+    python -m benchmarks.api_suite --base-url http://127.0.0.1:5000 ...
+
+In-process runs drive the Flask test client against synthetic datasets:
+the real CSVs with cities.csv resampled to each ``--rows`` size (0 means
+the real data as it is). OpenWeatherMap is replaced by a local HTTP stub
+and MongoDB by an in-memory collection, so results do not depend on the
+network. ``--base-url`` sends the same requests to a running server
+instead; it serves its own data, and ``python -m
+benchmarks.api_suite.stubs`` starts a weather stub it can be pointed at
+with OPENWEATHER_URL.
+
+Every scenario reports p50/p95/p99 latency, throughput and peak RSS while
+it ran. ``--output`` writes the results as JSON; ``--compare`` checks them
+against such a file and exits with status 1 when a scenario got slower
+than ``--tolerance`` allows.
+"""
@@ -0,0 +1,129 @@
+import argparse
+import datetime
+import os
+import platform
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.api_suite import __doc__ as SUITE_DOC  # noqa: E402
+from benchmarks.api_suite import report  # noqa: E402
+from benchmarks.api_suite.runner import FlaskClient, HttpClient, rss_mb, run_scenario  # noqa: E402
+from benchmarks.api_suite.scenarios import build_scenarios  # noqa: E402
+from benchmarks.api_suite.stubs import InMemoryUsers, WeatherStub  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=SUITE_DOC.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[0, 10000, 100000],
+                        help="city rows per synthetic dataset; 0 = the real data")
+    parser.add_argument('--requests', type=int, default=200, help="measured requests per scenario")
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--only', nargs='+', help="scenario names to run")
+    parser.add_argument('--base-url', help="benchmark a running server instead of the app in-process")
+    parser.add_argument('--admin-token', help="X-Admin-Token for /admin/reload with --base-url")
+    parser.add_argument('--weather-latency-ms', type=float, default=0,
+                        help="delay added by the in-process OpenWeatherMap stub")
+    parser.add_argument('--output', help="write results as JSON (use as a later --compare baseline)")
+    parser.add_argument('--compare', help="baseline JSON to check the results against")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed p50/p95 slowdown (0.25 = 25%%)")
+    parser.add_argument('--min-delta-ms', type=float, default=0.5,
+                        help="ignore slowdowns smaller than this many milliseconds")
+    return parser.parse_args()
+
+
+def run_all(args, make_client, rows, admin_token, extra=None):
+    scenarios = build_scenarios(make_client(), admin_token)
+    if args.only:
+        scenarios = [s for s in scenarios if s.name in args.only]
+    results = {}
+    for scenario in scenarios:
+        results[scenario.name] = run_scenario(
+            make_client, scenario, args.requests, args.concurrency, args.warmup,
+            measure_memory=not args.base_url)
+    report.print_results(f"rows={rows}", results)
+    return dict(extra or {}, rows=rows, results=results)
+
+
+def run_in_process(args):
+    # Must be set before the app is imported
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ.setdefault('OPENWEATHER_API_KEY', 'benchmark')
+    admin_token = os.environ.setdefault('ADMIN_TOKEN', 'benchmark-admin')
+    stub = WeatherStub(latency_ms=args.weather_latency_ms).start()
+    os.environ['OPENWEATHER_URL'] = stub.url
+
+    import app as backend
+    from benchmarks.api_suite.synthetic import write_dataset
+    from datasets import COMPILED_DIR, DATA_DIR
+
+    backend.use_users_collection(InMemoryUsers())
+    manager = backend.dataset_manager
+
+    def make_client():
+        return FlaskClient(backend.app)
+
+    runs = []
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as data_dir:
+            build_seconds = None
+            if rows:
+                started = time.perf_counter()
+                write_dataset(data_dir, rows)
+                build_seconds = round(time.perf_counter() - started, 2)
+                manager.data_dir, manager.compiled_dir = data_dir, os.path.join(data_dir, 'compiled')
+            else:
+                manager.data_dir, manager.compiled_dir = DATA_DIR, COMPILED_DIR
+            started = time.perf_counter()
+            snap = manager.reload()
+            extra = {
+                'build_seconds': build_seconds,
+                'load_seconds': round(time.perf_counter() - started, 2),
+                'source': snap.source,
+                'rss_after_load_mb': rss_mb(),
+            }
+            runs.append(run_all(args, make_client, len(snap.cities_df), admin_token, extra))
+    stub.stop()
+    return runs
+
+
+def main():
+    args = parse_args()
+    if args.base_url:
+        runs = [run_all(args, lambda: HttpClient(args.base_url), 'server', args.admin_token)]
+    else:
+        runs = run_in_process(args)
+
+    import numpy
+    import pandas
+
+    result = {
+        'meta': {
+            'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'mode': 'http' if args.base_url else 'in-process',
+            'base_url': args.base_url,
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'warmup': args.warmup,
+            'python': platform.python_version(),
+            'numpy': numpy.__version__,
+            'pandas': pandas.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'runs': runs,
+    }
+    if args.output:
+        report.save(args.output, result)
+        print(f"\nWrote {args.output}")
+    if args.compare:
+        if report.compare(result, report.load(args.compare), args.tolerance, args.min_delta_ms):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Result tables and baseline comparison."""
+import json
+
+COMPARED = ('p50_ms', 'p95_ms')
+
+
+def print_results(rows_label, results):
+    print(f"\n== {rows_label} ==")
+    print(f"{'scenario':<28} {'n':>5} {'err':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'req/s':>9} {'peak MB':>8}")
+    for name, r in results.items():
+        peak = '-' if r['peak_rss_mb'] is None else f"{r['peak_rss_mb']:.1f}"
+        print(f"{name:<28} {r['requests']:>5} {r['errors']:>4} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} "
+              f"{r['p99_ms']:>9.2f} {r['throughput_rps']:>9.1f} {peak:>8}")
+
+
+def load(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save(path, report):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=1, sort_keys=True)
+
+
+def compare(report, baseline, tolerance, min_delta_ms):
+    """Print scenarios slower than the baseline; returns the regressions.
+
+    A scenario regresses when its p50 or p95 grew by more than
+    ``tolerance`` (0.25 = 25%) and by at least ``min_delta_ms``, which
+    keeps sub-millisecond jitter from failing a run.
+    """
+    old_runs = {str(run['rows']): run['results'] for run in baseline.get('runs', [])}
+    regressions = []
+    print(f"\n== compared with baseline from {baseline.get('meta', {}).get('created', '?')} ==")
+    for run in report['runs']:
+        old_results = old_runs.get(str(run['rows']))
+        if old_results is None:
+            print(f"rows={run['rows']}: not in baseline")
+            continue
+        for name, new in run['results'].items():
+            old = old_results.get(name)
+            if old is None:
+                continue
+            for metric in COMPARED:
+                before, after = old[metric], new[metric]
+                if after > before * (1 + tolerance) and after - before >= min_delta_ms:
+                    regressions.append((run['rows'], name, metric, before, after))
+    for rows, name, metric, before, after in regressions:
+        ratio = f" ({after / before:.2f}x)" if before else ""
+        print(f"REGRESSION rows={rows} {name} {metric}: {before:.2f} -> {after:.2f} ms{ratio}")
+    if not regressions:
+        print(f"no regressions beyond {tolerance:.0%} / {min_delta_ms} ms")
+    return regressions
@@ -0,0 +1,128 @@
+"""Drive scenarios and collect latency, throughput and peak RSS."""
+import itertools
+import re
+import resource
+import threading
+import time
+
+import numpy as np
+
+
+class FlaskClient:
+    """In-process requests through the Flask test client."""
+
+    def __init__(self, app):
+        self._client = app.test_client()
+
+    def request(self, method, path, body=None, headers=None):
+        response = self._client.open(path, method=method, json=body, headers=headers)
+        response.get_data()
+        return response.status_code
+
+    def fetch(self, path, method='GET', body=None):
+        response = self._client.open(path, method=method, json=body)
+        return response.status_code, response.get_json()
+
+
+class HttpClient:
+    """Requests to a running server over one keep-alive session."""
+
+    def __init__(self, base_url, timeout=30):
+        import requests
+
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self._session = requests.Session()
+
+    def request(self, method, path, body=None, headers=None):
+        response = self._session.request(method, self.base_url + path, json=body, headers=headers,
+                                         timeout=self.timeout)
+        return response.status_code
+
+    def fetch(self, path, method='GET', body=None):
+        response = self._session.request(method, self.base_url + path, json=body, timeout=self.timeout)
+        return response.status_code, response.json()
+
+
+# ---------------------------------------------
+# Peak memory
+# ---------------------------------------------
+def _status_kb(field):
+    try:
+        with open('/proc/self/status') as f:
+            match = re.search(rf'^{field}:\s+(\d+)', f.read(), re.MULTILINE)
+        return int(match.group(1)) if match else None
+    except OSError:
+        return None
+
+
+def reset_peak_rss():
+    """Restart the VmHWM high-water mark (Linux); returns False if unsupported."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    """Peak RSS since the last reset, or of the whole process (ru_maxrss) off Linux."""
+    kb = _status_kb('VmHWM')
+    if kb is None:
+        kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return kb / 1024
+
+
+def rss_mb():
+    kb = _status_kb('VmRSS')
+    return None if kb is None else kb / 1024
+
+
+# ---------------------------------------------
+# Running a scenario
+# ---------------------------------------------
+def run_scenario(make_client, scenario, requests, concurrency=1, warmup=5, measure_memory=True):
+    """Send ``requests`` requests from ``concurrency`` threads; return stats."""
+    n = min(requests, scenario.max_requests or requests)
+    clients = [make_client() for _ in range(concurrency)]
+    for i in range(min(warmup, n)):
+        scenario.send(clients[0], -1 - i)
+
+    latencies = np.zeros(n)
+    statuses = np.zeros(n, dtype=np.int32)
+    counter = itertools.count()
+
+    def worker(client):
+        for i in iter(lambda: next(counter), None):
+            if i >= n:
+                return
+            started = time.perf_counter()
+            try:
+                statuses[i] = scenario.send(client, i)
+            except Exception:
+                statuses[i] = -1
+            latencies[i] = time.perf_counter() - started
+
+    memory = measure_memory and reset_peak_rss()
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(c,)) for c in clients]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    ms = latencies * 1000
+    return {
+        'method': scenario.method,
+        'requests': n,
+        'errors': int((statuses != scenario.expect).sum()),
+        'p50_ms': round(float(np.percentile(ms, 50)), 3),
+        'p95_ms': round(float(np.percentile(ms, 95)), 3),
+        'p99_ms': round(float(np.percentile(ms, 99)), 3),
+        'mean_ms': round(float(ms.mean()), 3),
+        'max_ms': round(float(ms.max()), 3),
+        'throughput_rps': round(n / elapsed, 1) if elapsed else None,
+        'peak_rss_mb': round(peak_rss_mb(), 1) if memory else None,
+    }
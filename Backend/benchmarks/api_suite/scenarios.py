@@ -0,0 +1,133 @@
+"""One request pattern per API route.
+
+Parameters (a state, one of its cities, categories) are discovered through
+the API itself, so the same scenarios run in-process and against a server.
+"""
+import uuid
+from urllib.parse import quote
+
+BENCH_PASSWORD = 'bench-password'
+
+
+class Scenario:
+    """A request to repeat: ``path``/``body`` may be callables of the
+    request number, for requests that must differ (new usernames, cache
+    misses). ``max_requests`` caps slow routes such as bcrypt logins.
+    """
+
+    def __init__(self, name, method, path, body=None, headers=None, expect=200, max_requests=None):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.body = body
+        self.headers = headers
+        self.expect = expect
+        self.max_requests = max_requests
+
+    def send(self, client, i):
+        path = self.path(i) if callable(self.path) else self.path
+        body = self.body(i) if callable(self.body) else self.body
+        return client.request(self.method, path, body, self.headers)
+
+
+def _get_json(client, path):
+    status, data = client.fetch(path)
+    if status != 200:
+        raise RuntimeError(f"GET {path} returned {status}; cannot set up the benchmark")
+    return data
+
+
+def discover(client):
+    """Pick the names the scenarios use from the API's own data."""
+    states = _get_json(client, '/states')
+    state = 'Kerala' if 'Kerala' in states else states[0]
+    cities = [c for c in _get_json(client, f'/states/{quote(state)}/cities')
+              if c.get('city_name') and c.get('latitude') is not None]
+    if not cities:
+        raise RuntimeError(f"No cities with coordinates in {state}")
+    city = cities[0]
+    other = cities[1] if len(cities) > 1 else city
+    categories = _get_json(client, '/interests')['interests']
+    return {
+        'states': states,
+        'state': state,
+        'city': city,
+        'other_city': other,
+        'categories': [city['category']] + [c for c in categories if c != city['category']][:2],
+    }
+
+
+def login_token(client, username):
+    """Register ``username`` (if needed) and return a session token."""
+    client.request('POST', '/register', {'username': username, 'email': f'{username}@bench.local',
+                                         'password': BENCH_PASSWORD, 'interests': ['Beach', 'Heritage']})
+    status, data = client.fetch('/login', 'POST', {'username': username, 'password': BENCH_PASSWORD})
+    if status != 200:
+        raise RuntimeError(f"Benchmark login failed with status {status}")
+    return data['token']
+
+
+def build_scenarios(client, admin_token=None):
+    p = discover(client)
+    state, city, other = p['state'], p['city'], p['other_city']
+    s, c = quote(state), quote(city['city_name'])
+    category = city['category']
+    run_id = uuid.uuid4().hex[:8]
+    username = f'bench_{run_id}'
+    auth = {'Authorization': f'Bearer {login_token(client, username)}'}
+    recommend = {'interests': p['categories'], 'max_risk': 10, 'limit': 20}
+
+    scenarios = [
+        Scenario('index', 'GET', '/'),
+        Scenario('states', 'GET', '/states'),
+        Scenario('state_details', 'GET', f'/states/{s}'),
+        Scenario('cities', 'GET', '/cities'),
+        Scenario('interests', 'GET', '/interests'),
+        Scenario('state_risk', 'GET', f'/states/{s}/risk'),
+        Scenario('tourism_trends', 'GET', f'/states/{s}/tourism_trends'),
+        Scenario('state_cities', 'GET', f'/states/{s}/cities'),
+        Scenario('city_details', 'GET', f'/states/{s}/cities/{c}'),
+        Scenario('city_risk', 'GET', f'/states/{s}/cities/{c}/risk'),
+        Scenario('search_places', 'GET',
+                 f'/search_places?category={quote(category)}&min_rating=4&max_risk=0.5&limit=50'),
+        Scenario('places_nearby', 'GET',
+                 f"/places/nearby?lat={city['latitude']}&lon={city['longitude']}&k=10"),
+        Scenario('recommend', 'POST', '/recommend', recommend),
+        # A distinct min_rating per request misses the ranking cache
+        Scenario('recommend_uncached', 'POST', '/recommend',
+                 lambda i: dict(recommend, min_rating=1e-9 * (i + 2))),
+        Scenario('recommend_weighted_uncached', 'POST', '/recommend',
+                 lambda i: dict(recommend, min_rating=1e-9 * (i + 2), weights={'hazard': 1})),
+        Scenario('itinerary', 'POST', '/itinerary',
+                 {'start': {'state': state, 'city': city['city_name']}, 'days': 5}),
+        Scenario('debug_categories', 'GET', '/debug/categories'),
+        Scenario('compare_cities', 'GET',
+                 f"/compare/cities?state1={s}&city1={c}&state2={s}&city2={quote(other['city_name'])}"),
+        Scenario('compare_states', 'POST', '/compare/states', {'states': p['states'][:5]}),
+        Scenario('predict_trend', 'GET', f'/predict_trend/{s}'),
+        Scenario('predict_trend_all', 'GET', '/predict_trend'),
+        Scenario('predict_trend_category', 'GET', f'/predict_trend/{s}/{quote(category)}'),
+        Scenario('cluster_states', 'GET', '/cluster_states'),
+        Scenario('weather_city', 'GET', f'/weather/city/{c}'),
+        Scenario('weather_state', 'GET', f'/weather/state/{s}'),
+        Scenario('weather_batch', 'POST', '/weather/batch', {'states': p['states'][:10]}),
+        Scenario('weather_cache_stats', 'GET', '/weather/cache/stats'),
+        Scenario('metrics', 'GET', '/metrics'),
+        Scenario('register', 'POST', '/register',
+                 lambda i: {'username': f'{username}_{i}', 'email': f'{username}_{i}@bench.local',
+                            'password': BENCH_PASSWORD},
+                 expect=201, max_requests=20),
+        Scenario('login', 'POST', '/login', {'username': username, 'password': BENCH_PASSWORD},
+                 max_requests=20),
+        Scenario('user_interests', 'GET', f'/user/{username}/interests', headers=auth),
+        Scenario('user_interests_update', 'PUT', f'/user/{username}/interests',
+                 {'interests': ['Beach', 'Heritage', 'Hill Station']}, headers=auth),
+        Scenario('user_recommendations', 'GET', f'/user/{username}/recommendations?limit=20',
+                 headers=auth),
+        Scenario('users', 'GET', '/users?limit=50'),
+    ]
+    if admin_token:
+        # Last: a reload swaps the snapshot and clears the data caches
+        scenarios.append(Scenario('admin_reload', 'POST', '/admin/reload',
+                                  headers={'X-Admin-Token': admin_token}, max_requests=5))
+    return scenarios
@@ -0,0 +1,179 @@
+"""Local stand-ins for MongoDB and OpenWeatherMap.
+
+``python -m benchmarks.api_suite.stubs [--port 8099] [--latency-ms 0]``
+runs the weather stub on its own, e.g. for a server started with
+OPENWEATHER_URL=http://127.0.0.1:8099/data/2.5/weather.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+
+# ---------------------------------------------
+# MongoDB users collection
+# ---------------------------------------------
+def _matches(doc, query):
+    for key, expected in query.items():
+        value = doc.get(key)
+        if isinstance(expected, dict):
+            if '$gt' in expected and not (value is not None and value > expected['$gt']):
+                return False
+        elif value != expected:
+            return False
+    return True
+
+
+def _project(doc, projection):
+    if not projection:
+        return dict(doc)
+    if any(projection.values()):
+        out = {k: doc[k] for k, keep in projection.items() if keep and k in doc}
+        if projection.get('_id', 1):
+            out['_id'] = doc['_id']
+        return out
+    return {k: v for k, v in doc.items() if projection.get(k, 1)}
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self._docs = docs
+
+    def sort(self, key, direction=1):
+        self._docs.sort(key=lambda d: d[key], reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        self._docs = self._docs[:n]
+        return self
+
+    def __iter__(self):
+        return iter(self._docs)
+
+
+class InMemoryUsers:
+    """The subset of a pymongo collection the app uses for users.
+
+    Documents are kept in insertion (= ``_id``) order with a dict per
+    unique index, so username lookups cost O(1) like an index seek.
+    """
+
+    def __init__(self):
+        self._docs = []
+        self._unique = {}
+        self._lock = threading.Lock()
+
+    def create_index(self, keys, name=None, unique=False):
+        field = keys[0][0]
+        if unique:
+            self._unique.setdefault(field, {d[field]: d for d in self._docs if field in d})
+        return name or f"{field}_1"
+
+    def insert_one(self, doc):
+        with self._lock:
+            for field, index in self._unique.items():
+                if doc.get(field) in index:
+                    raise DuplicateKeyError(f"E11000 duplicate key error: {field}")
+            doc = dict(doc, _id=ObjectId())
+            self._docs.append(doc)
+            for field, index in self._unique.items():
+                if field in doc:
+                    index[doc[field]] = doc
+        return SimpleNamespace(inserted_id=doc['_id'])
+
+    def _find(self, query):
+        for field, index in self._unique.items():
+            if isinstance(query.get(field), str):
+                doc = index.get(query[field])
+                return [doc] if doc is not None and _matches(doc, query) else []
+        return [d for d in self._docs if _matches(d, query)]
+
+    def find_one(self, query, projection=None):
+        docs = self._find(query)
+        return _project(docs[0], projection) if docs else None
+
+    def find(self, query=None, projection=None):
+        return _Cursor([_project(d, projection) for d in self._find(query or {})])
+
+    def update_one(self, query, update):
+        with self._lock:
+            docs = self._find(query)
+            if docs:
+                docs[0].update(update.get('$set', {}))
+        return SimpleNamespace(matched_count=len(docs[:1]), modified_count=len(docs[:1]))
+
+
+# ---------------------------------------------
+# OpenWeatherMap
+# ---------------------------------------------
+def weather_payload(city):
+    return {
+        "name": city,
+        "main": {"temp": 29.4, "feels_like": 31.2, "humidity": 62, "pressure": 1008},
+        "weather": [{"description": "scattered clouds"}],
+        "wind": {"speed": 3.1},
+        "visibility": 8000,
+        "clouds": {"all": 40},
+    }
+
+
+class WeatherStub:
+    """Answers /data/2.5/weather?q=<city>,IN like OpenWeatherMap, locally.
+
+    ``latency_ms`` delays every response to imitate the real provider.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency_ms=0):
+        latency = latency_ms / 1000.0
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query)
+                city = query.get('q', [''])[0].split(',')[0]
+                if latency:
+                    time.sleep(latency)
+                body = json.dumps(weather_payload(city)).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/data/2.5/weather"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="weather-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the OpenWeatherMap stub.")
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    args = parser.parse_args()
+
+    stub = WeatherStub(port=args.port, latency_ms=args.latency_ms)
+    print(f"OPENWEATHER_URL={stub.url}")
+    stub.server.serve_forever()
@@ -0,0 +1,44 @@
+"""Synthetic datasets scaled from the real CSVs."""
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from datasets import DATA_DIR, DATASET_FILES, compile_datasets
+
+# Copies are moved by up to this many degrees (~10 km) so they are
+# distinct points for the geo index.
+JITTER_DEG = 0.1
+
+
+def write_dataset(out_dir, city_rows, seed=0):
+    """Write a dataset with ``city_rows`` cities to ``out_dir`` and compile it.
+
+    The states and risk tables are copied unchanged. Cities are the real
+    rows followed by rows sampled from them with replacement; every copy
+    gets a numbered name ("Munnar 2") and jittered coordinates so name
+    lookups and nearest-place queries see distinct places. Returns the
+    compiled store's manifest.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    for name, filename in DATASET_FILES.items():
+        if name != "cities":
+            shutil.copyfile(os.path.join(DATA_DIR, filename), os.path.join(out_dir, filename))
+
+    cities = pd.read_csv(os.path.join(DATA_DIR, DATASET_FILES["cities"]))
+    if city_rows <= len(cities):
+        cities = cities.iloc[:city_rows]
+    else:
+        rng = np.random.default_rng(seed)
+        extra = cities.sample(n=city_rows - len(cities), replace=True, random_state=seed)
+        copy_number = extra.groupby(level=0).cumcount() + 2
+        named = extra['city_name'].notna()
+        extra.loc[named, 'city_name'] = (extra.loc[named, 'city_name'] + ' ' +
+                                         copy_number[named].astype(str))
+        for col in ('latitude', 'longitude'):
+            extra[col] = extra[col] + rng.uniform(-JITTER_DEG, JITTER_DEG, len(extra))
+        cities = pd.concat([cities, extra], ignore_index=True)
+    cities.to_csv(os.path.join(out_dir, DATASET_FILES["cities"]), index=False)
+
+    return compile_datasets(out_dir, os.path.join(out_dir, "compiled"))
@@ -0,0 +1,93 @@
+"""Benchmark: data-route latency during a login storm, inline bcrypt vs pool.
+
+Usage (from Backend/):
+    python benchmarks/auth_load.py [--logins 32] [--rounds 12] [--probes 200]
+
+``--logins`` threads verify a password concurrently, first by calling
+bcrypt inline on the request thread (what /login used to do) and then
+through ``app.password_hasher``. Meanwhile a probe thread requests
+/states/<state> through the Flask test client and records its latency, and
+the storm's own throughput and admission-control rejections are reported.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from passwords import HasherBusy, check_password, hash_password  # noqa: E402
+
+
+def storm(verify, pw_hash, n, stop):
+    done = [0, 0]  # verified, rejected
+
+    def worker():
+        while not stop.is_set():
+            try:
+                verify(pw_hash, 'secret')
+                done[0] += 1
+            except HasherBusy:
+                done[1] += 1
+                time.sleep(0.01)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(n)]
+    for t in threads:
+        t.start()
+    return threads, done
+
+
+def probe(client, count):
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        client.get('/states/Goa')
+        latencies.append(time.perf_counter() - start)
+        time.sleep(0.005)
+    return np.array(latencies) * 1000
+
+
+def run(label, client, verify, pw_hash, args):
+    stop = threading.Event()
+    threads, done = storm(verify, pw_hash, args.logins, stop)
+    started = time.perf_counter()
+    ms = probe(client, args.probes)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    for t in threads:
+        t.join()
+    print(f"{label:>8}  {np.percentile(ms, 50):>8.2f}  {np.percentile(ms, 99):>8.2f}  "
+          f"{done[0] / elapsed:>10.1f}  {done[1]:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--logins', type=int, default=32)
+    parser.add_argument('--rounds', type=int, default=12)
+    parser.add_argument('--probes', type=int, default=200)
+    args = parser.parse_args()
+
+    # Imported here, not at module level: the hashing pool's workers
+    # re-import this script and must not load the app
+    from app import app, password_hasher
+
+    password_hasher.rounds = args.rounds
+    password_hasher.start()
+    pw_hash = hash_password('secret', args.rounds)
+
+    client = app.test_client()
+    idle = probe(client, args.probes)
+    print(f"pool_size={password_hasher.pool_size} max_pending={password_hasher.max_pending} "
+          f"rounds={args.rounds} cpus={os.cpu_count()}")
+    print(f"{'mode':>8}  {'p50 ms':>8}  {'p99 ms':>8}  {'logins/s':>10}  {'rejected':>8}")
+    print(f"{'idle':>8}  {np.percentile(idle, 50):>8.2f}  {np.percentile(idle, 99):>8.2f}  {'-':>10}  {'-':>8}")
+    run('inline', client, check_password, pw_hash, args)
+    run('pool', client, password_hasher.check, pw_hash, args)
+    password_hasher.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Benchmark: cold dataset load from CSV vs the compiled binary store.
+
+Usage (from Backend/):
+    python benchmarks/dataset_load.py [--scale 1 50] [--repeat 5]
+
+Each measurement runs in a fresh interpreter so it includes everything a
+worker pays at startup: importing pandas, reading the three datasets and
+building the place-search month masks. Peak RSS is read from the child's
+VmHWM (falling back to ru_maxrss off Linux). ``--scale N`` resamples every table
+to N times its row count in a temporary directory before compiling it.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from datasets import DATA_DIR, DATASET_FILES, compile_datasets  # noqa: E402
+
+CHILD = """
+import json, resource, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {backend!r})
+from datasets import load_datasets
+ds = load_datasets({data_dir!r}, {compiled_dir!r}, prefer_compiled={compiled!r})
+assert ds.source == {source!r}, ds.source
+elapsed = time.perf_counter() - started
+try:
+    # VmHWM is reset on exec; ru_maxrss can carry over the parent's peak
+    with open("/proc/self/status") as f:
+        peak_kb = next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+except OSError:
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{"seconds": elapsed, "maxrss_kb": peak_kb}}))
+"""
+
+
+def write_scaled(data_dir, scale):
+    for name, filename in DATASET_FILES.items():
+        df = pd.read_csv(os.path.join(DATA_DIR, filename))
+        df = df.sample(n=len(df) * scale, replace=True, random_state=0)
+        df.to_csv(os.path.join(data_dir, filename), index=False)
+
+
+def run_child(data_dir, compiled_dir, compiled):
+    code = CHILD.format(backend=BACKEND_DIR, data_dir=data_dir, compiled_dir=compiled_dir,
+                        compiled=compiled, source="compiled" if compiled else "csv")
+    out = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True)
+    return json.loads(out.stdout)
+
+
+def measure(data_dir, compiled_dir, compiled, repeat):
+    runs = [run_child(data_dir, compiled_dir, compiled) for _ in range(repeat)]
+    return min(r["seconds"] for r in runs), min(r["maxrss_kb"] for r in runs) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=int, nargs='+', default=[1, 50])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'scale':>6}  {'cities':>8}  {'csv (s)':>8}  {'bin (s)':>8}  {'csv RSS MB':>10}  {'bin RSS MB':>10}")
+    for scale in args.scale:
+        with tempfile.TemporaryDirectory() as data_dir:
+            write_scaled(data_dir, scale)
+            compiled_dir = os.path.join(data_dir, "compiled")
+            manifest = compile_datasets(data_dir, compiled_dir)
+            csv_s, csv_rss = measure(data_dir, compiled_dir, False, args.repeat)
+            bin_s, bin_rss = measure(data_dir, compiled_dir, True, args.repeat)
+        rows = manifest["datasets"]["cities"]["rows"]
+        print(f"{scale:>6}  {rows:>8}  {csv_s:>8.3f}  {bin_s:>8.3f}  {csv_rss:>10.1f}  {bin_rss:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
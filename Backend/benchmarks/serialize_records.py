@@ -0,0 +1,78 @@
+"""Benchmark: iterrows-based record building vs dataframe_to_records.
+
+Usage (from Backend/):
+    python benchmarks/serialize_records.py [--rows 10000 100000] [--repeat 3]
+
+Rows are synthesized by resampling data/cities.csv, so the column mix and
+NaN pattern match the real POI table.
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import (  # noqa: E402
+    RECOMMENDATION_COLUMNS,
+    RECOMMENDATION_FLOAT_COLUMNS,
+    dataframe_to_records,
+    dataset_manager,
+)
+
+
+def iterrows_records(df):
+    """The per-row loop /recommend used before dataframe_to_records."""
+    recommendations = []
+    for _, row in df.iterrows():
+        recommendations.append({
+            'state_name': row['state_name'],
+            'city_name': row['city_name'],
+            'category': row['category'],
+            'description': row.get('description', ''),
+            'tourist_rating': float(row['tourist_rating']) if pd.notna(row['tourist_rating']) else 0,
+            'risk_index': float(row['risk_index']) if pd.notna(row['risk_index']) else 0,
+            'best_time_to_visit': row.get('best_time_to_visit', ''),
+            'popular_months': row.get('popular_months', ''),
+            'latitude': float(row['latitude']) if pd.notna(row['latitude']) else 0,
+            'longitude': float(row['longitude']) if pd.notna(row['longitude']) else 0
+        })
+    return recommendations
+
+
+def columnar_records(df):
+    return dataframe_to_records(
+        df,
+        columns=RECOMMENDATION_COLUMNS,
+        float_columns=RECOMMENDATION_FLOAT_COLUMNS,
+        fill=''
+    )
+
+
+def best_time(fn, df, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(df)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8}  {'iterrows (s)':>12}  {'columnar (s)':>12}  {'speedup':>8}")
+    for n in args.rows:
+        df = dataset_manager.snapshot.cities_df.sample(n=n, replace=True, random_state=0).reset_index(drop=True)
+        slow = best_time(iterrows_records, df, args.repeat)
+        fast = best_time(columnar_records, df, args.repeat)
+        print(f"{n:>8}  {slow:>12.4f}  {fast:>12.4f}  {slow / fast:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,333 @@
+"""Dataset loading for the Tourism Risk Dashboard API.
+
+The CSVs in ``data/`` are the source of truth. ``python datasets.py`` (or
+``compile_datasets()``) compiles them into ``data/compiled/``: one ``.npy``
+file per column, numeric columns stored as-is and text columns as int32
+codes plus a JSON list of categories, together with precomputed month
+masks for place search. ``load_datasets()`` memory-maps the compiled files
+when they match the current CSVs and falls back to parsing the CSVs
+otherwise, so a stale or missing build never serves old data.
+
+``DatasetManager`` keeps the snapshot built from the loaded datasets and
+swaps in a new one when the files change, without a restart.
+"""
+import json
+import logging
+import os
+import re
+import threading
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+COMPILED_DIR = os.path.join(DATA_DIR, "compiled")
+
+# Bump when the compiled layout changes so old builds are ignored.
+FORMAT_VERSION = 1
+
+DATASET_FILES = {
+    "states_complete": "states_complete.csv",
+    "cities": "cities.csv",
+    "risk": "risk_data.csv",
+}
+
+logger = logging.getLogger(__name__)
+
+Datasets = namedtuple("Datasets", ["states_complete", "cities", "risk", "city_month_masks", "source"])
+
+
+# ---------------------------------------------
+# Month parsing (shared by the app and the build step)
+# ---------------------------------------------
+MONTHS = ['january', 'february', 'march', 'april', 'may', 'june', 'july',
+          'august', 'september', 'october', 'november', 'december']
+_MONTH_RE = re.compile(r'\b(' + '|'.join(m[:3] for m in MONTHS) + r')[a-z]*', re.IGNORECASE)
+_RANGE_RE = re.compile(r'\s-\s|\sto\s|–', re.IGNORECASE)
+
+
+def _month_name(prefix):
+    prefix = prefix.lower()
+    return next(m for m in MONTHS if m.startswith(prefix))
+
+
+def month_bits(text, ranges=False):
+    """Parse free text into a 12-bit mask (bit 0 = January).
+
+    "October,November" sets those months. With ``ranges``, "October - March"
+    or "May to June and September to October" set every month in each
+    (wrap-around) range.
+    """
+    if not isinstance(text, str):
+        return 0
+    mask = 0
+    segments = re.split(r',|\band\b', text) if ranges else [text]
+    for segment in segments:
+        found = [MONTHS.index(_month_name(m)) for m in _MONTH_RE.findall(segment)]
+        if ranges and len(found) == 2 and _RANGE_RE.search(segment):
+            start, end = found
+            span = (end - start) % 12
+            for i in range(span + 1):
+                mask |= 1 << ((start + i) % 12)
+        else:
+            for i in found:
+                mask |= 1 << i
+    return mask
+
+
+def city_month_masks(cities):
+    """Return (popular_months, any_months) uint16 masks for ``cities`` rows.
+
+    ``any_months`` also includes the best_time_to_visit ranges.
+    """
+    popular = np.array([month_bits(v) for v in cities['popular_months']], dtype=np.uint16)
+    best_time = np.array([month_bits(v, ranges=True) for v in cities['best_time_to_visit']], dtype=np.uint16)
+    return popular, popular | best_time
+
+
+# ---------------------------------------------
+# CSV path
+# ---------------------------------------------
+def read_csv_dataset(name, data_dir=DATA_DIR):
+    df = pd.read_csv(os.path.join(data_dir, DATASET_FILES[name]))
+    if name == "cities" and 'state_name' in df.columns:
+        df['state_name'] = df['state_name'].str.strip()
+    return df
+
+
+def _source_stamp(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+# ---------------------------------------------
+# Compiled (memory-mapped) path
+# ---------------------------------------------
+def _save_npy(path, values):
+    # Write then rename: a running process that has the old file mapped
+    # keeps reading the old inode instead of a truncated one.
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, values)
+    os.replace(tmp, path)
+
+
+def _save_json(path, payload, **kwargs):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f, **kwargs)
+    os.replace(tmp, path)
+
+
+def _write_frame(df, out_dir):
+    os.makedirs(out_dir, exist_ok=True)
+    columns = []
+    for i, col in enumerate(df.columns):
+        series = df[col]
+        stem = f"{i:03d}"
+        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            _save_npy(os.path.join(out_dir, stem + ".npy"), series.to_numpy())
+            columns.append({"name": col, "kind": "numeric", "file": stem + ".npy"})
+        else:
+            codes, categories = pd.factorize(series)
+            _save_npy(os.path.join(out_dir, stem + ".npy"), codes.astype(np.int32))
+            _save_json(os.path.join(out_dir, stem + ".categories.json"),
+                       [str(c) for c in categories], ensure_ascii=False)
+            columns.append({"name": col, "kind": "text", "file": stem + ".npy",
+                            "categories": stem + ".categories.json"})
+    return columns
+
+
+def _read_frame(manifest, in_dir):
+    data = {}
+    for column in manifest["columns"]:
+        values = np.load(os.path.join(in_dir, column["file"]), mmap_mode="r")
+        if column["kind"] == "numeric":
+            data[column["name"]] = values
+        else:
+            with open(os.path.join(in_dir, column["categories"]), encoding="utf-8") as f:
+                categories = np.array(json.load(f) + [np.nan], dtype=object)
+            # code -1 (missing) picks the trailing NaN; pandas infers the
+            # same string dtype read_csv would have produced
+            data[column["name"]] = pd.Series(categories[values], name=column["name"])
+    # copy=False keeps numeric columns backed by the read-only memory maps
+    return pd.DataFrame(data, copy=False)
+
+
+def compile_datasets(data_dir=DATA_DIR, out_dir=COMPILED_DIR):
+    """Compile the CSVs in ``data_dir`` into the binary store at ``out_dir``."""
+    manifest = {"format_version": FORMAT_VERSION, "datasets": {}}
+    frames = {}
+    for name, filename in DATASET_FILES.items():
+        df = read_csv_dataset(name, data_dir)
+        frames[name] = df
+        manifest["datasets"][name] = {
+            "rows": len(df),
+            "source": _source_stamp(os.path.join(data_dir, filename)),
+            "columns": _write_frame(df, os.path.join(out_dir, name)),
+        }
+
+    popular, any_months = city_month_masks(frames["cities"])
+    _save_npy(os.path.join(out_dir, "cities_popular_months.npy"), popular)
+    _save_npy(os.path.join(out_dir, "cities_any_months.npy"), any_months)
+
+    # Written last: a build interrupted before this point is simply ignored.
+    _save_json(os.path.join(out_dir, "manifest.json"), manifest, indent=1)
+    return manifest
+
+
+def _load_compiled(data_dir, compiled_dir):
+    """Return Datasets from the compiled store, or None if it is missing or stale."""
+    try:
+        with open(os.path.join(compiled_dir, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("format_version") != FORMAT_VERSION:
+        return None
+    for name, filename in DATASET_FILES.items():
+        entry = manifest["datasets"].get(name)
+        if entry is None or entry["source"] != _source_stamp(os.path.join(data_dir, filename)):
+            return None
+
+    frames = {name: _read_frame(manifest["datasets"][name], os.path.join(compiled_dir, name))
+              for name in DATASET_FILES}
+    masks = (
+        np.load(os.path.join(compiled_dir, "cities_popular_months.npy"), mmap_mode="r"),
+        np.load(os.path.join(compiled_dir, "cities_any_months.npy"), mmap_mode="r"),
+    )
+    return Datasets(frames["states_complete"], frames["cities"], frames["risk"], masks, "compiled")
+
+
+def load_datasets(data_dir=DATA_DIR, compiled_dir=COMPILED_DIR, prefer_compiled=True):
+    """Load all datasets, from the compiled store when it is up to date."""
+    if prefer_compiled:
+        compiled = _load_compiled(data_dir, compiled_dir)
+        if compiled is not None:
+            return compiled
+
+    cities = read_csv_dataset("cities", data_dir)
+    return Datasets(
+        read_csv_dataset("states_complete", data_dir),
+        cities,
+        read_csv_dataset("risk", data_dir),
+        city_month_masks(cities),
+        "csv",
+    )
+
+
+# ---------------------------------------------
+# Hot reload
+# ---------------------------------------------
+class DatasetManager:
+    """Owns the current snapshot and replaces it when the data changes.
+
+    ``build(datasets, version)`` turns freshly loaded ``Datasets`` into the
+    snapshot object request handlers use. A reload builds the new snapshot
+    completely (on the watcher thread or the caller's thread) and only then
+    rebinds ``self.snapshot``, a single atomic assignment: handlers that
+    read ``snapshot`` once per request see either the old or the new
+    version, never a mix. Listeners are called with each new snapshot, e.g.
+    to drop caches of the previous version. If loading or building fails,
+    the current snapshot keeps serving.
+    """
+
+    def __init__(self, build, data_dir=DATA_DIR, compiled_dir=COMPILED_DIR, log=None):
+        self.build = build
+        self.log = log or logger
+        self.data_dir = data_dir
+        self.compiled_dir = compiled_dir
+        self.snapshot = None
+        self.version = 0
+        self._listeners = []
+        self._reload_lock = threading.Lock()
+        self._stamps = None
+        self._stop = threading.Event()
+        self._watcher = None
+
+    def add_listener(self, fn):
+        self._listeners.append(fn)
+        return fn
+
+    def source_stamps(self):
+        """Size/mtime of every file a reload reads (None for missing files)."""
+        paths = [os.path.join(self.data_dir, f) for f in DATASET_FILES.values()]
+        paths.append(os.path.join(self.compiled_dir, "manifest.json"))
+        stamps = {}
+        for path in paths:
+            try:
+                stamps[path] = _source_stamp(path)
+            except OSError:
+                stamps[path] = None
+        return stamps
+
+    def changed(self):
+        return self.source_stamps() != self._stamps
+
+    def reload(self):
+        """Load the datasets, build a new snapshot and swap it in. Returns it."""
+        with self._reload_lock:
+            # Stamped before reading: an edit that lands mid-load is picked
+            # up again by the next check.
+            stamps = self.source_stamps()
+            datasets = load_datasets(self.data_dir, self.compiled_dir)
+            version = self.version + 1
+            snapshot = self.build(datasets, version)
+            self.snapshot = snapshot
+            self.version = version
+            self._stamps = stamps
+        self.log.info("Loaded datasets version %d from %s", version, datasets.source)
+        for fn in self._listeners:
+            fn(snapshot)
+        return snapshot
+
+    def watch(self, interval):
+        """Poll the data files every ``interval`` seconds and reload on change.
+
+        A change is applied once the files have stopped changing for one
+        interval, so a CSV that is still being written is not loaded.
+        """
+        if self._watcher is not None and self._watcher.is_alive():
+            return self._watcher
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, args=(interval,),
+                                         name="dataset-watcher", daemon=True)
+        self._watcher.start()
+        return self._watcher
+
+    def stop(self):
+        self._stop.set()
+
+    def _watch(self, interval):
+        pending = None
+        while not self._stop.wait(interval):
+            stamps = self.source_stamps()
+            if stamps == self._stamps:
+                pending = None
+            elif stamps != pending:
+                pending = stamps
+            else:
+                pending = None
+                try:
+                    self.reload()
+                except Exception:
+                    self.log.exception("Dataset reload failed; still serving version %d", self.version)
+                    # Don't retry the same broken files on every tick.
+                    self._stamps = stamps
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compile the CSV datasets into the binary store.")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--out-dir", default=None, help="defaults to <data-dir>/compiled")
+    args = parser.parse_args()
+
+    out_dir = args.out_dir or os.path.join(args.data_dir, "compiled")
+    result = compile_datasets(args.data_dir, out_dir)
+    for name, entry in result["datasets"].items():
+        print(f"{name}: {entry['rows']} rows, {len(entry['columns'])} columns")
+    print(f"Wrote {out_dir}")
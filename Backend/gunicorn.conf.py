@@ -0,0 +1,58 @@
+"""Production server settings for the Flask app.
+
+Run from Backend/:
+    gunicorn app:app
+
+The app module is imported once in the master (``preload_app``): the
+datasets are loaded, lookup indexes and trend models are built, and the heap
+is frozen before forking, so workers share those pages copy-on-write and
+start without re-reading any data. Each worker opens its own MongoDB client
+and watches the data files itself (DATA_RELOAD_INTERVAL), swapping in a new
+snapshot when they change.
+
+Environment overrides: PORT / GUNICORN_BIND, WEB_CONCURRENCY (workers),
+GUNICORN_THREADS, GUNICORN_TIMEOUT, GUNICORN_MAX_REQUESTS.
+"""
+import gc
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '5000')}")
+workers = int(os.getenv("WEB_CONCURRENCY", min(multiprocessing.cpu_count() * 2 + 1, 8)))
+# Threads let a worker keep serving data routes while others wait on
+# OpenWeatherMap or MongoDB.
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = 30
+keepalive = 5
+# Recycle workers periodically; jitter avoids restarting them all at once.
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = max_requests // 10
+
+preload_app = True
+accesslog = "-"
+
+
+def when_ready(server):
+    import app as backend
+
+    # The master never serves requests; stop its MongoDB health check and
+    # drop the client so its sockets are not inherited by workers.
+    backend.close_mongo()
+    snap = backend.dataset_manager.snapshot
+    server.log.info("Datasets loaded: %d states, %d cities",
+                    len(snap.states_complete_df), len(snap.cities_df))
+
+
+def pre_fork(server, worker):
+    # Move everything allocated so far into the permanent generation so the
+    # cyclic GC in workers never writes to (and un-shares) those pages.
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    import app as backend
+
+    backend.connect_mongo()
+    backend.start_background_tasks()
@@ -0,0 +1,149 @@
+"""Password hashing off the request threads.
+
+bcrypt costs 100ms+ of CPU per call by design. ``PasswordHasher`` runs it in
+a small dedicated process pool, so a burst of logins uses at most
+``pool_size`` cores and cannot starve the threads serving data routes. At
+most ``max_pending`` jobs may be queued or running; beyond that callers get
+``HasherBusy`` immediately instead of waiting in an ever-growing queue.
+
+Pool processes come from a ``forkserver`` where the platform supports it.
+The pool is started from a background thread while other app threads are
+running, and forking such a process directly copies their held locks into
+the child; the fork server is a fresh single-threaded process, so children
+forked from it are safe. Both it and ``spawn`` (the fallback, and the only
+option on Windows) re-import the launching script in the workers, so that
+script must not load the app at import time: the development server runs
+from run.py, and gunicorn/uvicorn import the app as a module.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+import bcrypt
+
+
+class HasherBusy(Exception):
+    """Raised when the hashing pool is at capacity or too slow to answer."""
+
+
+def hash_password(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def check_password(pw_hash, password):
+    try:
+        return bcrypt.checkpw(password.encode('utf-8'), pw_hash.encode('utf-8'))
+    except ValueError:
+        # Not a bcrypt hash
+        return False
+
+
+def _noop():
+    return None
+
+
+class PasswordHasher:
+    """Bounded process pool for bcrypt with admission control.
+
+    ``hash``/``check`` block the calling thread until the result is ready
+    (at most ``timeout`` seconds) and raise ``HasherBusy`` when the job is
+    rejected or times out. ``stats`` reports counters for monitoring.
+    """
+
+    def __init__(self, pool_size=2, rounds=12, max_pending=16, timeout=10):
+        self.pool_size = pool_size
+        self.rounds = rounds
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def _executor(self):
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.pool_size,
+                        mp_context=multiprocessing.get_context(method))
+        return self._pool
+
+    def start(self):
+        """Start the pool's processes ahead of the first login."""
+        pool = self._executor()
+        for future in [pool.submit(_noop) for _ in range(self.pool_size)]:
+            future.result()
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HasherBusy("Password hashing pool is at capacity")
+        with self._lock:
+            self.in_flight += 1
+        try:
+            future = self._executor().submit(fn, *args)
+        except BrokenProcessPool:
+            self._release(None)
+            self._discard_broken_pool()
+            raise
+        except Exception:
+            self._release(None)
+            raise
+        # The slot is released when the job finishes, not when the caller
+        # gives up, so timed-out work still counts against the limit.
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            with self._lock:
+                self.timeouts += 1
+            raise HasherBusy("Password hashing timed out")
+        except BrokenProcessPool:
+            # A child died (e.g. OOM-killed); start a fresh pool next time
+            self._discard_broken_pool()
+            raise
+
+    def _discard_broken_pool(self):
+        with self._pool_lock:
+            if self._pool is not None and getattr(self._pool, '_broken', False):
+                self._pool = None
+
+    def _release(self, future):
+        with self._lock:
+            self.in_flight -= 1
+            if future is not None:
+                self.completed += 1
+        self._slots.release()
+
+    def hash(self, password):
+        return self._run(hash_password, password, self.rounds)
+
+    def check(self, pw_hash, password):
+        return self._run(check_password, pw_hash, password)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pool_size": self.pool_size,
+                "rounds": self.rounds,
+                "max_pending": self.max_pending,
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+            }
@@ -0,0 +1,20 @@
+"""Development server.
+
+Run from Backend/:
+    python run.py
+
+The bcrypt pool's workers (see passwords.py) re-import the main script
+before running a job, so the app must not be it: importing this module
+does nothing, and each worker only loads ``passwords``. For production see
+gunicorn.conf.py or asgi.py.
+"""
+
+if __name__ == '__main__':
+    from app import app, start_background_tasks
+
+    start_background_tasks()
+    # Disable the Werkzeug auto-reloader on Windows to avoid occasional
+    # OSError: [WinError 10038] when the reloader's thread/server interact
+    # poorly with the system selector. In development you can set debug
+    # True but keep use_reloader False to avoid the issue.
+    app.run(debug=True, use_reloader=False)
@@ -0,0 +1,28 @@
+import io
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import NameIndex, build_state_comparison  # noqa: E402
+
+STATES_CSV = """state_name,capital,region,population,area_km2,gdp_inr_crore,literacy_rate,tourism_rank,best_season,famous_for,safety_index,visitors_2020,visitors_2021,visitors_2022,visitors_2023,visitors_2024,visitors_2025
+Goa,Panaji,West,,3702,80000,88.7,1,"['Winter']","['Beaches']",,100,,300,400,500,600
+Kerala,,South,35000000,38863,900000,94.0,2,"['Monsoon']","['Backwaters']",0.8,10,20,30,40,50,60
+"""
+
+
+def test_blank_cells_fall_back_to_defaults():
+    states_df = pd.read_csv(io.StringIO(STATES_CSV))
+    cities_df = pd.DataFrame({'state_name': ['Goa'], 'city_name': ['Panaji'], 'tourist_rating': [4.5]})
+
+    table = build_state_comparison(states_df, cities_df, NameIndex(cities_df['state_name']))
+    result = table.compare(['Goa', 'Kerala'], [0, 1])
+
+    assert result['population'] == {'Goa': 0, 'Kerala': 35000000}
+    assert result['visitors_2021'] == {'Goa': 0, 'Kerala': 20}
+    assert result['safety_index']['Goa'] == 1.0
+    assert result['capital']['Kerala'] == ''
+    assert result['top_city'] == {'Goa': 'Panaji', 'Kerala': ''}
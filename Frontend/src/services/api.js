@@ -45,6 +45,7 @@ export const authAPI = {
   login: (credentials) => api.post('/login', credentials),
   getUserInterests: (username) => api.get(`/user/${username}/interests`),
   updateUserInterests: (username, interests) => api.post(`/user/${username}/interests`, interests),
+  getUserRecommendations: (username, params) => api.get(`/user/${username}/recommendations`, { params }),
 };
 
 // Data APIs
@@ -55,6 +56,9 @@ export const dataAPI = {
   getStateRisk: (stateName) => api.get(`/states/${stateName}/risk`),
   getStateTourismTrends: (stateName) => api.get(`/states/${stateName}/tourism_trends`),
   getCityDetails: (stateName, cityName) => api.get(`/states/${stateName}/cities/${cityName}`),
+  getCityRisk: (stateName, cityName) => api.get(`/states/${stateName}/cities/${cityName}/risk`),
+  getNearbyPlaces: (params) => api.get('/places/nearby', { params }),
+  planItinerary: (data) => api.post('/itinerary', data),
     // Get interests from the dedicated /interests endpoint
     getInterests: () => api.get('/interests'),
   getPredictTrends: (stateName) => api.get(`/predict_trend/${stateName}`),